@@ -0,0 +1,190 @@
+"""端到端基准测试
+
+在本地模拟服务器 (mock_server.py) 上为 N 个模拟账号依次运行各脚本，记录：
+
+    wall        脚本总耗时（秒）
+    requests    模拟服务器收到的请求数（含浏览器发出的页面和接口请求）
+    bytes       模拟服务器收发的字节数
+    launches    Chromium 启动次数（取自追踪报告中的 browser.launch）
+    rss_mb      Python 进程峰值 RSS（MB，不含 Chromium 子进程）
+
+结果与基线文件比较并打印变化百分比；基线需要在同一台机器上用 --save-baseline 生成。
+退出码非 0 的运行只列出指标，不与基线比较，也不能保存为基线。
+
+用法:
+    python bench/benchmark.py --accounts 3
+    python bench/benchmark.py --scripts checkin,auto_read --repeat 3
+    python bench/benchmark.py --save-baseline          # 以本次结果作为新基线
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from mock_server import MockZaimanhua, make_cookie
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(BENCH_DIR), 'src')
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+
+# 脚本名 -> 额外命令行参数
+SCRIPTS = {
+    'checkin': [],
+    'comment': [],
+    'auto_read': ['--max-minutes', '1'],
+    'lottery': [],
+    'draw_4th': [],
+    '2026new_year': [],
+}
+METRICS = ('wall', 'requests', 'bytes', 'launches', 'rss_mb')
+
+
+def run_script(name, mock, accounts, time_scale, work_dir):
+    """运行一次脚本并返回各项指标"""
+    cache_dir = tempfile.mkdtemp(prefix='cache-', dir=work_dir)
+    trace_path = os.path.join(work_dir, f'trace-{name}.json')
+    log_path = os.path.join(work_dir, f'{name}.log')
+
+    env = {k: v for k, v in os.environ.items() if not k.startswith('ZAIMANHUA_COOKIE')}
+    env.update(mock.env())
+    env.update({
+        'ZAIMANHUA_CACHE_DIR': cache_dir,
+        'ZAIMANHUA_STATE_DIR': os.path.join(cache_dir, 'state'),
+        'ZAIMANHUA_TRACE_REPORT': trace_path,
+        'ZAIMANHUA_TIME_SCALE': str(time_scale),
+        'PYTHONUNBUFFERED': '1',
+    })
+    for i in range(accounts):
+        env[f'ZAIMANHUA_COOKIE_{i + 1}'] = make_cookie(i + 2)
+
+    mock.reset()
+    start = time.perf_counter()
+    with open(log_path, 'w', encoding='utf-8') as log:
+        proc = subprocess.Popen(
+            [sys.executable, os.path.join(SRC_DIR, f'{name}.py')] + SCRIPTS[name],
+            env=env, stdout=log, stderr=subprocess.STDOUT,
+        )
+        _, status, usage = os.wait4(proc.pid, 0)
+    wall = time.perf_counter() - start
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    stats = mock.snapshot()
+
+    launches = 0
+    try:
+        with open(trace_path, encoding='utf-8') as f:
+            launches = sum(item['count'] for item in json.load(f)['summary'] if item['name'] == 'browser.launch')
+    except (OSError, ValueError, KeyError):
+        pass
+
+    return {
+        'wall': round(wall, 3),
+        'requests': stats['requests'],
+        'bytes': stats['bytes_in'] + stats['bytes_out'],
+        'launches': launches,
+        'rss_mb': round(usage.ru_maxrss / 1024, 1),  # Linux 下 ru_maxrss 单位为 KB
+        'exit_code': proc.returncode,
+        'log': log_path,
+    }
+
+
+def median_result(runs):
+    """多次运行取各指标中位数"""
+    result = {key: statistics.median(run[key] for run in runs) for key in METRICS}
+    result['exit_code'] = max(run['exit_code'] for run in runs)
+    result['log'] = runs[-1]['log']
+    return result
+
+
+def print_report(results, baseline):
+    print(f"\n{'脚本':<14}{'wall(s)':>10}{'requests':>10}{'bytes':>12}{'launches':>10}{'rss(MB)':>10}  退出码")
+    for name, result in results.items():
+        print(f"{name:<16}{result['wall']:>10.2f}{result['requests']:>10}{result['bytes']:>12}"
+              f"{result['launches']:>10}{result['rss_mb']:>10.1f}  {result['exit_code']}")
+        if result['exit_code'] != 0:
+            print(f"{'  vs 基线':<16}运行失败，不参与比较（日志: {result['log']}）")
+            continue
+        base = baseline.get(name)
+        if not base:
+            continue
+        if base.get('exit_code', 0) != 0:
+            print(f"{'  vs 基线':<16}基线中的该脚本运行失败，不参与比较")
+            continue
+        deltas = []
+        for key in METRICS:
+            if base.get(key):
+                deltas.append(f"{key} {(result[key] - base[key]) / base[key] * 100:+.1f}%")
+        print(f"{'  vs 基线':<16}{', '.join(deltas)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Zaimanhua 端到端基准测试')
+    parser.add_argument('--scripts', default=','.join(SCRIPTS), help='要运行的脚本，逗号分隔')
+    parser.add_argument('--accounts', type=int, default=3, help='模拟账号数量')
+    parser.add_argument('--repeat', type=int, default=1, help='每个脚本运行次数（取中位数）')
+    parser.add_argument('--port', type=int, default=18800, help='模拟服务器起始端口')
+    parser.add_argument('--latency', type=float, default=0.05, help='模拟服务器平均延迟（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='模拟服务器错误率')
+    parser.add_argument('--time-scale', type=float, default=60, help='阅读时间加速倍数')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='基线文件路径')
+    parser.add_argument('--save-baseline', action='store_true', help='把本次结果写入基线文件')
+    parser.add_argument('--output', help='把本次结果写入 JSON 文件')
+    args = parser.parse_args()
+
+    names = [n.strip() for n in args.scripts.split(',') if n.strip()]
+    unknown = [n for n in names if n not in SCRIPTS]
+    if unknown:
+        parser.error(f"未知脚本: {', '.join(unknown)}（可选: {', '.join(SCRIPTS)}）")
+
+    mock = MockZaimanhua(port=args.port, latency=args.latency, jitter=args.latency / 2,
+                         error_rate=args.error_rate, read_seconds=600 / args.time_scale).start()
+    work_dir = tempfile.mkdtemp(prefix='zaimanhua-bench-')
+    results = {}
+    try:
+        for name in names:
+            runs = []
+            for i in range(args.repeat):
+                print(f"运行 {name} ({i + 1}/{args.repeat})...", flush=True)
+                runs.append(run_script(name, mock, args.accounts, args.time_scale, work_dir))
+            results[name] = median_result(runs)
+    finally:
+        mock.stop()
+
+    try:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f).get('results', {})
+    except (OSError, ValueError):
+        baseline = {}
+
+    print_report(results, baseline)
+    print(f"\n日志与追踪报告: {work_dir}")
+
+    report = {
+        'accounts': args.accounts,
+        'latency': args.latency,
+        'time_scale': args.time_scale,
+        'python': sys.version.split()[0],
+        'results': {name: {k: v for k, v in r.items() if k != 'log'} for name, r in results.items()},
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    failed = [name for name, r in results.items() if r['exit_code'] != 0]
+    if args.save_baseline and failed:
+        print(f"以下脚本运行失败，未保存基线: {', '.join(failed)}")
+    elif args.save_baseline:
+        # 只运行了部分脚本时保留其他脚本的旧基线
+        saved = dict(report, results=dict(baseline, **report['results']))
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(saved, f, ensure_ascii=False, indent=2)
+        print(f"已保存基线: {args.baseline}")
+
+    return all(r['exit_code'] == 0 for r in results.values())
+
+
+if __name__ == '__main__':
+    success = main()
+    exit(0 if success else 1)
@@ -0,0 +1,513 @@
+"""本地模拟 Zaimanhua 服务器
+
+在本机为每个站点主机各开一个端口，实现脚本用到的接口和页面，用于离线端到端测试和基准测试：
+
+    www        首页漫画链接、漫画详情页（评论框）
+    i          用户中心页面（签到按钮、领取按钮）、/lpi/v1/task/list 及领取/签到接口
+    v4api      排行榜、漫画详情、章节图片列表、图片（支持 Range）、评论接口
+    luck-draw  抽奖页面和 drawApi/draw/*
+    activity   四周年 (/draw-4th/)、新年 (/newYear/) 活动页面和 drawApi/draw/*
+
+账号状态（任务进度、抽奖次数）按 token 保存在内存中，进程重启即重置。
+每个请求可按 --latency/--jitter 注入延迟，按 --error-rate 随机返回 503。
+任意主机上的 GET /__stats 返回请求数和收发字节数，POST /__reset 清空统计和账号状态。
+
+用法:
+    python bench/mock_server.py --port 8800 --print-env   # 打印需要设置的环境变量后常驻
+    eval "$(python bench/mock_server.py --port 8800 --print-env --exit)"
+
+模拟账号的 Cookie 可用 make_cookie(uid) 生成，uid 为奇数的账号未绑定手机号。
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+# 主机名 -> (环境变量名, 相对起始端口的偏移)
+SITES = {
+    'www': ('ZAIMANHUA_WWW_BASE', 0),
+    'i': ('ZAIMANHUA_I_BASE', 1),
+    'v4api': ('ZAIMANHUA_V4API_BASE', 2),
+    'luck-draw': ('ZAIMANHUA_LUCK_DRAW_BASE', 3),
+    'activity': ('ZAIMANHUA_ACTIVITY_BASE', 4),
+}
+
+DEFAULT_PORT = 8800
+IMAGE_SIZE = 150 * 1024       # 模拟图片大小（字节）
+COMIC_COUNT = 20
+CHAPTERS_PER_COMIC = 5
+PAGES_PER_CHAPTER = 12
+DEFAULT_READ_SECONDS = 600    # 阅读任务在首次读图后多少秒变为可领取
+
+TASKS = [
+    (8, '到此一游'),
+    (13, '阅读10分钟'),
+    (14, '每日一评'),
+    (16, 'VIP福利'),
+]
+
+PRIZES = ['1 积分', '3 积分', '谢谢参与', '阅读券']
+
+
+def make_cookie(uid, bind_phone=None):
+    """生成模拟账号的 Cookie 字符串（uid 为奇数时默认未绑定手机号）"""
+    if bind_phone is None:
+        bind_phone = '' if uid % 2 else f'188****{uid:04d}'
+    lginfo = {
+        'uid': uid,
+        'username': f'mock{uid}',
+        'nickname': f'模拟用户{uid}',
+        'bind_phone': bind_phone,
+        'token': f'mock-token-{uid}',
+    }
+    return f"lginfo={quote(json.dumps(lginfo, ensure_ascii=False))}; _ga=GA1.2.{uid}"
+
+
+class AccountState:
+    """单个 token 的任务和活动进度"""
+
+    def __init__(self, token):
+        self.token = token
+        uid = int(token.rsplit('-', 1)[-1]) if token.rsplit('-', 1)[-1].isdigit() else 0
+        self.uid = uid
+        self.phone_bound = uid % 2 == 0
+        self.tasks = {task_id: 1 for task_id, _ in TASKS}
+        self.tasks[16] = 2  # 模拟账号都是 VIP
+        self.first_read = None
+        # 每个活动主机各自一份抽奖状态
+        self.draw = {
+            host: {'times': 0, 'followTimes': 0, 'shareTimes': 0, 'readTimes': 0}
+            for host in ('luck-draw', 'activity')
+        }
+
+    def refresh_reading(self, read_seconds):
+        if self.tasks[13] == 1 and self.first_read and time.time() - self.first_read >= read_seconds:
+            self.tasks[13] = 2
+
+
+class MockZaimanhua:
+    """在 host 上从 port 开始为每个站点启动一个 HTTP 服务"""
+
+    def __init__(self, host='127.0.0.1', port=DEFAULT_PORT, latency=0.0, jitter=0.0,
+                 error_rate=0.0, read_seconds=DEFAULT_READ_SECONDS):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.read_seconds = read_seconds
+        self.lock = threading.Lock()
+        self.accounts = {}
+        self.servers = []
+        self.reset()
+
+    # ---- 生命周期 ----
+
+    def base_url(self, site):
+        return f"http://{self.host}:{self.port + SITES[site][1]}"
+
+    def env(self):
+        """脚本需要设置的环境变量"""
+        return {env_name: self.base_url(site) for site, (env_name, _) in SITES.items()}
+
+    def start(self):
+        for site in SITES:
+            server = ThreadingHTTPServer((self.host, self.port + SITES[site][1]), _make_handler(self, site))
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            self.servers.append(server)
+        return self
+
+    def stop(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+        self.servers = []
+
+    # ---- 统计 ----
+
+    def reset(self):
+        with self.lock:
+            self.accounts = {}
+            self.stats = {'requests': 0, 'bytes_in': 0, 'bytes_out': 0, 'errors_injected': 0, 'by_site': {}}
+
+    def record(self, site, path, bytes_in, bytes_out):
+        with self.lock:
+            self.stats['requests'] += 1
+            self.stats['bytes_in'] += bytes_in
+            self.stats['bytes_out'] += bytes_out
+            item = self.stats['by_site'].setdefault(site, {'requests': 0, 'bytes_out': 0, 'paths': {}})
+            item['requests'] += 1
+            item['bytes_out'] += bytes_out
+            item['paths'][path] = item['paths'].get(path, 0) + 1
+
+    def snapshot(self):
+        with self.lock:
+            return json.loads(json.dumps(self.stats))
+
+    def account(self, token):
+        with self.lock:
+            if token not in self.accounts:
+                self.accounts[token] = AccountState(token)
+            return self.accounts[token]
+
+
+# ---- 页面 ----
+
+_PAGE_SCRIPT = """
+<script>
+function lginfo() {
+  try { const v = localStorage.getItem('lginfo'); if (v) return JSON.parse(v); } catch (e) {}
+  const m = document.cookie.match(/(?:^|; )lginfo=([^;]*)/);
+  try { return m ? JSON.parse(decodeURIComponent(m[1])) : {}; } catch (e) { return {}; }
+}
+function api(url, body) {
+  return fetch(url, {
+    method: 'POST',
+    headers: {'Content-Type': 'application/json', 'Authorization': 'Bearer ' + (lginfo().token || '')},
+    body: JSON.stringify(body || {}),
+  }).then(r => r.json());
+}
+function toast(text, error) {
+  const el = document.createElement('div');
+  el.className = 'el-message' + (error ? ' el-message--error' : '');
+  el.textContent = text;
+  document.body.appendChild(el);
+}
+</script>
+"""
+
+
+def _html(title, body):
+    return f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>{title}</title>{_PAGE_SCRIPT}</head><body>{body}</body></html>"
+
+
+def _www_home():
+    links = ''.join(f"<a href='/info/{1000 + i}.html'>漫画{i}</a>" for i in range(COMIC_COUNT))
+    return _html('再漫画', f"<div class='comic-list'>{links}</div>")
+
+
+def _www_comic(mock, comic_id):
+    v4api = mock.base_url('v4api')
+    return _html(f'漫画{comic_id} - 再漫画', f"""
+<h1>漫画 {comic_id}</h1>
+<div class='comment-input'><textarea class='el-textarea__inner' placeholder='发表评论'></textarea></div>
+<div class='new_pl_submit'><a class='SubmitBtn' href='javascript:;'>发布</a></div>
+<script>
+document.querySelector('a.SubmitBtn').onclick = () => {{
+  const con = document.querySelector('textarea').value;
+  api('{v4api}/app/v1/comment/add', {{obj_id: {comic_id}, type: 4, content: con}})
+    .then(r => toast(r.errno === 0 ? '发布成功' : r.errmsg, r.errno !== 0));
+}};
+</script>""")
+
+
+def _i_home(state):
+    sign_done = state is not None and state.tasks[8] != 1
+    button = ("<button class='ant-btn ant-btn-primary' disabled>已签到</button>" if sign_done
+              else "<button class='ant-btn ant-btn-primary' onclick=\"api('/lpi/v1/task/sign').then(() => { this.textContent = '已签到'; this.disabled = true; })\">签到</button>")
+    rows = ''
+    if state is not None:
+        for task_id, title in TASKS:
+            status = state.tasks[task_id]
+            if status == 2:
+                rows += f"<div class='task'>{title}<button class='okBtn' onclick=\"api('/lpi/v1/task/receive', {{id: {task_id}}}).then(() => this.textContent = '已领取')\">领取</button></div>"
+            elif status == 3:
+                rows += f"<div class='task'>{title}<span>已领取</span></div>"
+    return _html('个人中心 - 再漫画', f"{button}<div class='task-list'>{rows}</div>")
+
+
+def _luck_draw_home(state):
+    draw = state.draw['luck-draw'] if state else {}
+    def btn(cls, key, action):
+        done = draw.get(key, 0) > 0
+        return (f"<div class='{cls}'>已完成</div>" if done
+                else f"<div class='{cls}' onclick=\"{action}\">去完成</div>")
+    return _html('抽奖', f"""
+<div class='navTab'><div class='tabItem'>活动介绍</div><div class='tabItem'>我的奖品</div></div>
+<div class='imgBoxP7'>
+  {btn('btn1', 'followTimes', "fetch('/drawApi/draw/follow', {headers: {'Authorization': 'Bearer ' + lginfo().token}})")}
+  {btn('btn2', 'shareTimes', "document.querySelector('.sharePopup').style.display = 'block'")}
+  {btn('btn3', 'readTimes', "fetch('/drawApi/draw/read', {headers: {'Authorization': 'Bearer ' + lginfo().token}})")}
+</div>
+<div class='sharePopup' style='display:none'>
+  <button class='copyBtn' onclick="fetch('/drawApi/draw/share', {{headers: {{'Authorization': 'Bearer ' + lginfo().token}}}})">复制</button>
+</div>""")
+
+
+def _draw_4th_page(state):
+    times = state.draw['activity']['times'] if state else 0
+    return _html('四周年', f"""
+<input class='dammu-input'><button class='dammu-send-btn'
+  onclick="api('/drawApi/draw/add_comment', {{con: document.querySelector('.dammu-input').value, source: 1}})">发送</button>
+<div class='draw-count'>次数：{times}</div>
+<div class='pointer' onclick="draw()">抽</div>
+<script>
+function draw() {{
+  fetch('/drawApi/draw/drawing', {{headers: {{'Authorization': 'Bearer ' + lginfo().token}}}}).then(r => r.json()).then(r => {{
+    if (r.errno !== 0) return;
+    const count = document.querySelector('.draw-count');
+    count.textContent = '次数：' + Math.max(0, parseInt(count.textContent.replace(/\\D/g, '')) - 1);
+    const popup = document.createElement('div');
+    popup.className = 'winPrize';
+    popup.innerHTML = "<div class='prizeName'><span>" + r.data.prize.name + "</span></div><img class='close' onclick='this.parentNode.remove()'>";
+    document.body.appendChild(popup);
+  }});
+}}
+</script>""")
+
+
+def _new_year_page(mock):
+    www = mock.base_url('www')
+    return _html('马年春节', f"""
+<a class='readBtn' href='{www}/info/1000.html'
+   onclick="fetch('/drawApi/draw/read', {{keepalive: true, headers: {{'Authorization': 'Bearer ' + lginfo().token}}}})">去观看</a>""")
+
+
+# ---- 请求处理 ----
+
+def _make_handler(mock, site):
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        server_version = 'ZaimanhuaMock/1.0'
+
+        def log_message(self, format, *args):
+            pass
+
+        # -- 工具 --
+
+        def _token(self):
+            auth = self.headers.get('Authorization', '')
+            if auth.startswith('Bearer ') and auth[7:].strip():
+                return auth[7:].strip()
+            for item in self.headers.get('Cookie', '').split(';'):
+                item = item.strip()
+                if item.startswith('lginfo='):
+                    try:
+                        return json.loads(unquote(item[7:])).get('token')
+                    except ValueError:
+                        return None
+            return None
+
+        def _send(self, status, body, content_type='application/json; charset=utf-8', headers=None):
+            if isinstance(body, (dict, list)):
+                body = json.dumps(body, ensure_ascii=False)
+            if isinstance(body, str):
+                body = body.encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('Access-Control-Allow-Origin', self.headers.get('Origin') or '*')
+            self.send_header('Access-Control-Allow-Credentials', 'true')
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            if self.command != 'HEAD':
+                self.wfile.write(body)
+            return len(body)
+
+        def _handle(self):
+            parts = urlsplit(self.path)
+            path = parts.path
+            query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+            length = int(self.headers.get('Content-Length') or 0)
+            raw = self.rfile.read(length) if length else b''
+            try:
+                body = json.loads(raw) if raw else {}
+            except ValueError:
+                body = {}
+
+            if path == '/__stats':
+                self._send(200, mock.snapshot())
+                return
+            if path == '/__reset':
+                mock.reset()
+                self._send(200, {'errno': 0})
+                return
+
+            if mock.latency or mock.jitter:
+                time.sleep(max(0.0, mock.latency + random.uniform(-mock.jitter, mock.jitter)))
+
+            if self.command == 'OPTIONS':
+                sent = self._send(204, b'', headers={
+                    'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
+                    'Access-Control-Allow-Headers': 'Authorization, Content-Type',
+                })
+            elif mock.error_rate and random.random() < mock.error_rate:
+                with mock.lock:
+                    mock.stats['errors_injected'] += 1
+                sent = self._send(503, {'errno': 503, 'errmsg': '服务繁忙(模拟)'})
+            else:
+                sent = self._route(path, query, body)
+            mock.record(site, path, length, sent)
+
+        do_GET = do_POST = do_OPTIONS = do_HEAD = _handle
+
+        # -- 路由 --
+
+        def _route(self, path, query, body):
+            token = self._token()
+            state = mock.account(token) if token else None
+            handler = getattr(self, f"_site_{site.replace('-', '_')}")
+            result = handler(path, query, body, state)
+            if result is None:
+                return self._send(404, {'errno': 404, 'errmsg': 'not found'})
+            return result
+
+        def _site_www(self, path, query, body, state):
+            if path in ('/', '/index.html'):
+                return self._send(200, _www_home(), 'text/html; charset=utf-8')
+            if path.startswith('/info/'):
+                comic_id = path[len('/info/'):].replace('.html', '').strip('/')
+                return self._send(200, _www_comic(mock, comic_id), 'text/html; charset=utf-8')
+            return None
+
+        def _site_i(self, path, query, body, state):
+            if path in ('/', '/index.html'):
+                return self._send(200, _i_home(state), 'text/html; charset=utf-8')
+            if not path.startswith('/lpi/'):
+                return None
+            if state is None:
+                return self._send(200, {'errno': 401, 'errmsg': '请先登录'})
+            if path == '/lpi/v1/task/list':
+                state.refresh_reading(mock.read_seconds)
+                day_tasks = [{'id': task_id, 'title': title, 'status': state.tasks[task_id]} for task_id, title in TASKS]
+                return self._send(200, {'errno': 0, 'errmsg': '', 'data': {
+                    'task': {'dayTask': day_tasks, 'newUserTask': []},
+                    'userCurrency': {'credits': 100},
+                }})
+            if path == '/lpi/v1/task/sign':
+                if state.tasks[8] == 1:
+                    state.tasks[8] = 2
+                return self._send(200, {'errno': 0, 'errmsg': ''})
+            if path == '/lpi/v1/task/receive' and self.command == 'POST':
+                task_id = body.get('id')
+                if task_id not in state.tasks:
+                    return self._send(200, {'errno': 1, 'errmsg': '参数错误'})
+                state.refresh_reading(mock.read_seconds)
+                if state.tasks[task_id] == 3:
+                    return self._send(200, {'errno': 1, 'errmsg': '奖励已领取'})
+                if state.tasks[task_id] != 2:
+                    return self._send(200, {'errno': 1, 'errmsg': '任务未完成'})
+                state.tasks[task_id] = 3
+                return self._send(200, {'errno': 0, 'errmsg': '', 'data': {'credits': 2}})
+            if path in ('/lpi/v1/task/receive', '/lpi/v1/task/claim', '/lpi/v1/task/get_reward'):
+                return self._send(200, {'errno': 1, 'errmsg': '参数错误'})
+            return None
+
+        def _site_v4api(self, path, query, body, state):
+            if path == '/app/v1/comic/rank/list':
+                comics = [{'comic_id': 1000 + i, 'title': f'漫画{i}'} for i in range(COMIC_COUNT)]
+                return self._send(200, {'errno': 0, 'data': {'data': comics}})
+            if path.startswith('/app/v1/comic/detail/'):
+                comic_id = path.rsplit('/', 1)[-1]
+                chapters = [{'chapter_id': c, 'chapter_title': f'第{c}话', 'canRead': c != CHAPTERS_PER_COMIC}
+                            for c in range(1, CHAPTERS_PER_COMIC + 1)]
+                return self._send(200, {'errno': 0, 'data': {'data': {
+                    'id': comic_id, 'chapters': [{'title': '连载', 'data': chapters}],
+                }}})
+            if path.startswith('/app/v1/comic/chapter/'):
+                comic_id, chapter_id = path.split('/')[-2:]
+                base = mock.base_url('v4api')
+                images = [f"{base}/img/{comic_id}/{chapter_id}/{n}.jpg" for n in range(1, PAGES_PER_CHAPTER + 1)]
+                return self._send(200, {'errno': 0, 'data': {'data': {'images': images}}})
+            if path.startswith('/img/'):
+                if state is not None and state.first_read is None:
+                    state.first_read = time.time()
+                range_header = self.headers.get('Range', '')
+                if range_header.startswith('bytes=0-0'):
+                    return self._send(206, b'\xff', 'image/jpeg', {'Content-Range': f'bytes 0-0/{IMAGE_SIZE}'})
+                return self._send(200, b'\xff' * IMAGE_SIZE, 'image/jpeg')
+            if path == '/app/v1/comment/add' and self.command == 'POST':
+                if state is None:
+                    return self._send(200, {'errno': 401, 'errmsg': '请先登录'})
+                if not state.phone_bound:
+                    return self._send(200, {'errno': 1, 'errmsg': '请先绑定手机号'})
+                if state.tasks[14] == 1:
+                    state.tasks[14] = 2
+                return self._send(200, {'errno': 0, 'errmsg': '', 'data': {'id': random.randint(1, 10 ** 6)}})
+            return None
+
+        def _draw_api(self, path, query, body, state):
+            if state is None:
+                return self._send(200, {'errno': 401, 'errmsg': '请先登录'})
+            draw = state.draw[site]
+            action = path.rsplit('/', 1)[-1]
+            if action == 'draw_load':
+                # 四周年活动读 voteInfo，新年活动读 userInfo / readingComicTimes
+                return self._send(200, {'errno': 0, 'data': dict(
+                    draw,
+                    voteInfo={'isShare': draw['shareTimes'] > 0, 'isReading': draw['readTimes'] > 0},
+                    userInfo={'uid': state.uid},
+                    readingComicTimes=draw['readTimes'],
+                )})
+            if action in ('follow', 'share', 'read'):
+                key = {'follow': 'followTimes', 'share': 'shareTimes', 'read': 'readTimes'}[action]
+                if draw[key] == 0:
+                    draw[key] = 1
+                    draw['times'] += 1
+                return self._send(200, {'errno': 0, 'errmsg': ''})
+            if action == 'add_comment':
+                return self._send(200, {'errno': 0, 'errmsg': ''})
+            if action == 'drawing':
+                if draw['times'] <= 0:
+                    return self._send(200, {'errno': 1, 'errmsg': '抽奖次数不足'})
+                draw['times'] -= 1
+                return self._send(200, {'errno': 0, 'data': {'prize': {'name': random.choice(PRIZES)}}})
+            return None
+
+        def _site_luck_draw(self, path, query, body, state):
+            if path in ('/', '/index.html'):
+                return self._send(200, _luck_draw_home(state), 'text/html; charset=utf-8')
+            if path.startswith('/drawApi/draw/'):
+                return self._draw_api(path, query, body, state)
+            return None
+
+        def _site_activity(self, path, query, body, state):
+            if path.startswith('/draw-4th'):
+                return self._send(200, _draw_4th_page(state), 'text/html; charset=utf-8')
+            if path.startswith('/newYear'):
+                return self._send(200, _new_year_page(mock), 'text/html; charset=utf-8')
+            if path.startswith('/drawApi/draw/'):
+                return self._draw_api(path, query, body, state)
+            return None
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地模拟 Zaimanhua 服务器')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'起始端口，依次占用 {len(SITES)} 个端口')
+    parser.add_argument('--latency', type=float, default=0.05, help='每个请求的平均延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.02, help='延迟随机抖动（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='随机返回 503 的比例 (0-1)')
+    parser.add_argument('--read-seconds', type=float, default=DEFAULT_READ_SECONDS, help='阅读任务完成所需秒数')
+    parser.add_argument('--print-env', action='store_true', help='打印 export 语句')
+    parser.add_argument('--exit', action='store_true', help='只打印环境变量，不启动服务')
+    args = parser.parse_args()
+
+    mock = MockZaimanhua(args.host, args.port, args.latency, args.jitter, args.error_rate, args.read_seconds)
+    if args.print_env:
+        for key, value in mock.env().items():
+            print(f"export {key}={value}")
+        print(f"export ZAIMANHUA_COOKIE_1='{make_cookie(2)}'")
+        print(f"export ZAIMANHUA_COOKIE_2='{make_cookie(3)}'")
+    if args.exit:
+        return
+
+    mock.start()
+    print(f"模拟服务器已启动: {', '.join(f'{site}={mock.base_url(site)}' for site in SITES)}", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        mock.stop()
+
+
+if __name__ == '__main__':
+    main()
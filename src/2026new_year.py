@@ -8,18 +8,16 @@
 import hashlib
 import random
 import time
-import requests
 
-from utils import (
-    extract_user_info_from_cookies,
-    get_all_cookies,
-    parse_cookies,
-    validate_cookie,
-)
-from playwright.sync_api import sync_playwright
+import tracing
+from browser import new_context
+from endpoints import ACTIVITY_BASE, WWW_BASE
+from http_client import http_get, http_post
+from runner import run_accounts
+from utils import get_all_accounts, validate_cookie
 
 # 配置
-BASE_URL = "https://activity.zaimanhua.com"
+BASE_URL = ACTIVITY_BASE
 SECRET = "z&m$h*_159753twt"
 MOBILE_UA = "Mozilla/5.0 (iPhone; CPU iPhone OS 16_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.0 Mobile/15E148 Safari/604.1"
 
@@ -80,11 +78,10 @@ def check_status(token: str) -> dict:
     params = get_api_params()
 
     try:
-        resp = requests.get(
+        resp = http_get(
             f"{BASE_URL}/drawApi/draw/draw_load",
             params=params,
             headers=headers,
-            timeout=10,
         )
         return resp.json()
     except Exception as e:
@@ -98,11 +95,10 @@ def do_share(token: str) -> bool:
     params = get_api_params()
 
     try:
-        resp = requests.get(
+        resp = http_get(
             f"{BASE_URL}/drawApi/draw/share",
             params=params,
             headers=headers,
-            timeout=10,
         )
         result = resp.json()
         if result.get("errno") == 0:
@@ -126,12 +122,11 @@ def do_comment(token: str) -> bool:
     body = {"con": blessing, "source": 1}
 
     try:
-        resp = requests.post(
+        resp = http_post(
             f"{BASE_URL}/drawApi/draw/add_comment",
             params=params,
             headers=headers,
             json=body,
-            timeout=10,
         )
         result = resp.json()
         if result.get("errno") == 0:
@@ -145,55 +140,44 @@ def do_comment(token: str) -> bool:
         return False
 
 
-def do_read_comic(cookie_str: str) -> bool:
+def do_read_comic(account) -> bool:
     """用 Playwright 访问漫画页面触发阅读任务"""
-    cookies = parse_cookies(cookie_str)
-    activity_cookies = [
-        {"name": c["name"], "value": c["value"], "domain": "activity.zaimanhua.com", "path": "/"}
-        for c in cookies
-    ]
-    main_cookies = [
-        {"name": c["name"], "value": c["value"], "domain": ".zaimanhua.com", "path": "/"}
-        for c in cookies
-    ]
-
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context(
-            user_agent=MOBILE_UA,
-            viewport={"width": 375, "height": 812},
-        )
-        context.add_cookies(activity_cookies + main_cookies)
-        page = context.new_page()
+    context = new_context(
+        account.activity_cookies + account.site_cookies,
+        user_agent=MOBILE_UA,
+        block_profile="activity",  # 活动页依赖 canvas 素材
+        viewport={"width": 375, "height": 812},
+    )
+    page = context.new_page()
+
+    try:
+        print("    访问活动页面...")
+        page.goto(f"{BASE_URL}/newYear/", wait_until="domcontentloaded", timeout=60000)
+        page.wait_for_timeout(5000)
 
-        try:
-            print("    访问活动页面...")
-            page.goto(f"{BASE_URL}/newYear/", wait_until="domcontentloaded", timeout=60000)
+        read_btn = page.locator("text=去观看").first
+        if read_btn.is_visible(timeout=3000):
+            read_btn.click(timeout=3000)
             page.wait_for_timeout(5000)
+            print("    已点击去观看按钮")
+        else:
+            print("    未找到观看按钮，直接访问漫画页面...")
+            page.goto(f"{WWW_BASE}/", wait_until="domcontentloaded", timeout=60000)
+            page.wait_for_timeout(3000)
 
-            read_btn = page.locator("text=去观看").first
-            if read_btn.is_visible(timeout=3000):
-                read_btn.click(timeout=3000)
+            comic_link = page.locator("a[href*='/comic/']").first
+            if comic_link.is_visible(timeout=3000):
+                comic_link.click(timeout=3000)
                 page.wait_for_timeout(5000)
-                print("    已点击去观看按钮")
-            else:
-                print("    未找到观看按钮，直接访问漫画页面...")
-                page.goto("https://www.zaimanhua.com/", wait_until="domcontentloaded", timeout=60000)
-                page.wait_for_timeout(3000)
-
-                comic_link = page.locator("a[href*='/comic/']").first
-                if comic_link.is_visible(timeout=3000):
-                    comic_link.click(timeout=3000)
-                    page.wait_for_timeout(5000)
-                    print("    已访问漫画页面")
-
-            print("  [v] 阅读漫画任务尝试完成")
-            return True
-        except Exception as e:
-            print(f"  [x] 阅读漫画任务异常: {e}")
-            return False
-        finally:
-            browser.close()
+                print("    已访问漫画页面")
+
+        print("  [v] 阅读漫画任务尝试完成")
+        return True
+    except Exception as e:
+        print(f"  [x] 阅读漫画任务异常: {e}")
+        return False
+    finally:
+        context.close()
 
 
 def do_drawing(token: str) -> dict:
@@ -202,11 +186,10 @@ def do_drawing(token: str) -> dict:
     params = get_api_params()
 
     try:
-        resp = requests.get(
+        resp = http_get(
             f"{BASE_URL}/drawApi/draw/drawing",
             params=params,
             headers=headers,
-            timeout=10,
         )
         result = resp.json()
         errno = result.get("errno")
@@ -239,23 +222,21 @@ def draw_all(token: str) -> int:
         print(f"    第 {i + 1}/{times} 次:")
         do_drawing(token)
         if i < times - 1:
-            time.sleep(2)
+            tracing.sleep(2, 'new_year.wait')
     return times
 
 
-def run_new_year(cookie_str: str, account_name: str):
+def run_new_year(account):
     """单账号单轮新年活动流程（由 cron 每 15 分钟触发）"""
     print(f"\n  === 开始新年活动 ===")
 
     # 1. 提取 token
-    user_info = extract_user_info_from_cookies(cookie_str)
-    token = user_info.get("token", "")
+    token = account.token
     if not token:
         print("  [x] Cookie 中未找到 token")
         return False
 
-    nickname = user_info.get("nickname") or user_info.get("username") or "未知"
-    print(f"  用户: {nickname}")
+    print(f"  用户: {account.nickname or '未知'}")
 
     # 2. 获取当前状态
     print("\n  [1] 获取活动状态...")
@@ -288,14 +269,14 @@ def run_new_year(cookie_str: str, account_name: str):
         do_share(token)
 
     if not read_done:
-        do_read_comic(cookie_str)
+        do_read_comic(account)
 
     # 4. 发送一条祝福
     print("\n  [3] 发送祝福...")
     do_comment(token)
 
     # 5. 用完所有抽奖次数
-    time.sleep(1)
+    tracing.sleep(1, 'new_year.wait')
     total = draw_all(token)
 
     if total == 0:
@@ -305,34 +286,33 @@ def run_new_year(cookie_str: str, account_name: str):
     return True
 
 
-def main():
+def new_year_account(account) -> bool:
+    """单账号新年活动流程（含 Cookie 验证）"""
+    print(f"\n{'=' * 50}")
+    print(f"账号: {account.label}")
+    print("=" * 50)
+
+    # 验证 Cookie 有效性
+    is_valid, error_msg = validate_cookie(account)
+    if not is_valid:
+        print(f"  [ERROR] Cookie 无效: {error_msg}")
+        print(f"  请更新 {account.label} 的 Cookie")
+        return False
+
+    return run_new_year(account)
+
+
+def main(accounts=None):
     """主函数"""
     print("=== 2026 马年春节活动自动化 ===\n")
 
-    cookies_list = get_all_cookies()
-    if not cookies_list:
+    if accounts is None:
+        accounts = get_all_accounts()
+    if not accounts:
         print("错误: 请设置 ZAIMANHUA_COOKIE 环境变量")
         return False
 
-    all_success = True
-    for account_name, cookie_str in cookies_list:
-        print(f"\n{'=' * 50}")
-        print(f"账号: {account_name}")
-        print("=" * 50)
-
-        # 验证 Cookie 有效性
-        is_valid, error_msg = validate_cookie(cookie_str)
-        if not is_valid:
-            print(f"  [ERROR] Cookie 无效: {error_msg}")
-            print(f"  请更新 {account_name} 的 Cookie")
-            all_success = False
-            continue
-
-        success = run_new_year(cookie_str, account_name)
-        if not success:
-            all_success = False
-
-    return all_success
+    return run_accounts(accounts, new_year_account)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,101 @@
+"""账号模型
+
+每个账号的 Cookie 只在加载时解析一次：token、uid、昵称、手机绑定状态，
+以及各站点 Playwright 格式的 Cookie 列表都预先算好，各模块之间直接传递 Account 对象。
+"""
+import hashlib
+import json
+from urllib.parse import unquote
+
+from endpoints import ACTIVITY_BASE, LUCK_DRAW_BASE, cookie_domain, shared_cookie_domain
+
+
+def parse_cookie_pairs(cookie_str):
+    """把 Cookie 字符串解析为 [(name, value), ...]"""
+    pairs = []
+    for item in cookie_str.split(';'):
+        item = item.strip()
+        if '=' in item:
+            name, value = item.split('=', 1)
+            pairs.append((name.strip(), value.strip()))
+    return pairs
+
+
+def extract_user_info(pairs):
+    """从 Cookie 中提取用户信息（lginfo 优先，其次 addinfo，token 可单独存在）"""
+    cookies = dict(pairs)
+    user_info = {}
+
+    # lginfo 是 URL 编码的 JSON
+    lginfo = cookies.get('lginfo')
+    if lginfo is not None:
+        lginfo_decoded = unquote(lginfo)
+        try:
+            parsed = json.loads(lginfo_decoded)
+            # 确保解析结果是字典类型（防止 JSON 字符串字面量导致 .get() 失败）
+            if isinstance(parsed, dict):
+                user_info = parsed
+        except json.JSONDecodeError:
+            # 如果不是 JSON，尝试解析 key=value&key=value 格式
+            for pair in lginfo_decoded.split('&'):
+                if '=' in pair:
+                    k, v = pair.split('=', 1)
+                    user_info[k] = v
+
+    # 如果没有从 lginfo 获取到，尝试从 addinfo 获取
+    if not user_info.get('uid') and 'addinfo' in cookies:
+        # addinfo 格式: uid|username|phone|token
+        parts = cookies['addinfo'].split('|')
+        if len(parts) >= 4:
+            user_info = {
+                'uid': int(parts[0]),
+                'username': parts[1],
+                'nickname': parts[1],
+                'bind_phone': parts[2],
+                'token': parts[3]
+            }
+
+    # 确保有 token
+    if not user_info.get('token') and cookies.get('token'):
+        user_info['token'] = cookies['token']
+
+    return user_info
+
+
+def _playwright_cookies(pairs, domain):
+    return [{'name': name, 'value': value, 'domain': domain, 'path': '/'} for name, value in pairs]
+
+
+class Account:
+    """单个账号：解析后的用户信息和各站点的 Playwright Cookie"""
+
+    __slots__ = (
+        'label', 'cookie_str', 'user_info', 'token', 'uid', 'nickname', 'phone_bound',
+        'site_cookies', 'luck_draw_cookies', 'activity_cookies',
+    )
+
+    def __init__(self, cookie_str, label='默认账号'):
+        pairs = parse_cookie_pairs(cookie_str)
+        self.cookie_str = cookie_str
+        self.user_info = extract_user_info(pairs)
+        self.token = self.user_info.get('token') or None
+        self.uid = self.user_info.get('uid')
+        self.nickname = self.user_info.get('nickname') or self.user_info.get('username')
+        # bind_phone 可能是实际号码(188****8888)或空/0
+        bind_phone = self.user_info.get('bind_phone')
+        self.phone_bound = bool(bind_phone) and str(bind_phone) not in ('0', '', 'None', 'False')
+        self.label = f"{label} ({self.nickname})" if self.nickname else label
+        # .zaimanhua.com（www / i）、luck-draw.、activity. 各自的 Cookie 列表
+        self.site_cookies = _playwright_cookies(pairs, shared_cookie_domain())
+        self.luck_draw_cookies = _playwright_cookies(pairs, cookie_domain(LUCK_DRAW_BASE))
+        self.activity_cookies = _playwright_cookies(pairs, cookie_domain(ACTIVITY_BASE))
+
+    @property
+    def key(self):
+        """本地缓存中区分账号的键：优先 uid，没有时取 token 摘要（不落盘明文 token）"""
+        if self.uid:
+            return str(self.uid)
+        return hashlib.sha1(str(self.token).encode()).hexdigest()[:12]
+
+    def __repr__(self):
+        return f"Account({self.label!r})"
@@ -1,21 +1,57 @@
+import os
+import queue
+import re
+import threading
 import time
 import random
-import requests
 import json
 import argparse
-from playwright.sync_api import sync_playwright
-from utils import get_all_cookies, extract_user_info_from_cookies, print_task_status, claim_task_reward, claim_rewards, create_browser_context
+from cache_store import JsonStore, LRUJsonCache
+from endpoints import V4API_BASE
+from http_client import http_get
+import tracing
+from runner import inherit_output, run_accounts
+from utils import get_all_accounts, print_task_status, claim_task_reward, claim_rewards, validate_cookie, get_task_list, extract_tasks_from_response
 
 # Configuration
-API_BASE = "https://v4api.zaimanhua.com/app/v1"
-PAGE_READ_TIME = 8  # Seconds per page
+API_BASE = f"{V4API_BASE}/app/v1"
+# 时间加速倍数，只用于本地模拟服务器上的基准测试（翻页和状态轮询间隔同比缩短）
+TIME_SCALE = float(os.environ.get('ZAIMANHUA_TIME_SCALE', 1))
+PAGE_READ_TIME = float(os.environ.get('ZAIMANHUA_PAGE_READ_TIME', 8)) / TIME_SCALE  # Seconds per page (调小可加速测试)
 USER_AGENT = 'okhttp/4.9.3'
+# 图片读取方式: range = 只请求首字节 (CDN 不支持 Range 时读完响应头即断开), full = 完整下载
+READ_MODE = os.environ.get('ZAIMANHUA_READ_MODE', 'range')
+CHEAP_MODE_GRACE_MINUTES = 13  # 省流模式阅读超过该时长任务仍未完成，则切换为完整下载
+CHEAP_MODE_VERDICT_TTL = 7 * 24 * 3600  # "省流模式无效"结论的保留时间（秒）
+PREFETCH_QUEUE_SIZE = 3  # 预取队列中待阅读章节数
+PREFETCH_EMPTY_BACKOFF = 2    # 整轮漫画都没有可读章节时的首次等待（秒），之后每轮翻倍
+PREFETCH_MAX_EMPTY_PASSES = 3  # 连续多少轮没有可读章节后停止预取
+POLL_INTERVAL_FAR = 60 / TIME_SCALE   # 距预计完成时间较远时的状态轮询间隔（秒）
+POLL_INTERVAL_NEAR = 10 / TIME_SCALE  # 接近预计完成时间时的状态轮询间隔（秒）
+POLL_NEAR_WINDOW = 90 / TIME_SCALE    # 预计完成时间前多少秒开始密集轮询
+TIMING_SAMPLES = 5       # 每个账号保留的历史完成耗时样本数
+
+# 漫画元数据缓存有效期（秒）
+METADATA_TTL = {
+    'rank': 3600,             # /comic/rank/list 排行榜变化较快
+    'detail': 24 * 3600,      # /comic/detail/{id} 章节列表
+    'chapter': 7 * 24 * 3600, # /comic/chapter/{id}/{cid} 图片列表基本不变
+}
+METADATA_CACHE_SIZE = 500
+
+# 省流模式是否能推进任务 13 的结论（跨运行保存）
+_read_mode_store = JsonStore('read_mode.json')
+
+# 各账号任务 13 的历史完成耗时（跨运行保存）
+_read_timing_store = JsonStore('read_timing.json')
+
+# 漫画元数据缓存，同一次运行的所有账号共享，跨运行持久化
+_metadata_cache = LRUJsonCache('comic_metadata.json', max_entries=METADATA_CACHE_SIZE)
 
 class ZaimanhuaAppReader:
-    def __init__(self, cookie_str, debug=False):
-        self.cookie_str = cookie_str
-        self.user_info = extract_user_info_from_cookies(cookie_str)
-        self.token = self.user_info.get('token')
+    def __init__(self, account, debug=False):
+        self.account = account
+        self.token = account.token
         self.debug = debug
         
         self.headers = {
@@ -23,37 +59,49 @@ class ZaimanhuaAppReader:
             'User-Agent': USER_AGENT,
             'Accept': 'application/json, text/plain, */*', 
         }
+
+        self.read_mode = READ_MODE if READ_MODE in ('range', 'full') else 'range'
+        if self.read_mode == 'range' and _read_mode_store.get('range_ineffective', ttl=CHEAP_MODE_VERDICT_TTL):
+            print("近期记录显示省流模式无法推进阅读任务，使用完整下载")
+            self.read_mode = 'full'
+        self.cheap_read_seconds = 0.0
+        self.pages_read = 0
+        self.bytes_received = 0
+        self.bytes_saved = 0
+
+        self.account_key = account.key
+
+        self._prefetcher = None
+        self._pending_images = []
+        self._page_until = 0.0  # 当前页的阅读截止时间，跨时间片保持翻页节奏
         
     def get_token(self):
         return self.token
 
-    def get_task_status(self, task_id):
-        """获取特定任务的状态码。返回状态码或 None。"""
-        url = "https://i.zaimanhua.com/lpi/v1/task/list"
+    def get_task_status(self, task_id, fresh=True):
+        """获取特定任务的状态码。返回状态码或 None。
+
+        阅读会持续改变任务进度，默认总是重新获取；fresh=False 时复用任务列表快照。
+        """
         try:
-            resp = requests.get(url, headers=self.headers, timeout=10)
-            if resp.status_code == 200:
-                data = resp.json()
-                if data.get('errno') == 0:
-                    task_data = data.get('data', {}).get('task', {})
-                    tasks = []
-                    if isinstance(task_data, dict):
-                         tasks.extend(task_data.get('dayTask', []) or [])
-                         tasks.extend(task_data.get('newUserTask', []) or [])
-                    
-                    for task in tasks:
-                        if task.get('id') == task_id:
-                            status = task.get('status')
-                            if self.debug:
-                                print(f"DEBUG: 任务 {task_id} 当前状态为 {status}")
-                            return status
+            task_result = get_task_list(self.token, fresh=fresh)
+            for task in extract_tasks_from_response(task_result):
+                if task.get('id') == task_id:
+                    status = task.get('status')
+                    if self.debug:
+                        print(f"DEBUG: 任务 {task_id} 当前状态为 {status}")
+                    return status
             return None
         except Exception as e:
             print(f"检查任务状态出错: {e}")
             return None
 
     def get_comic_list(self):
-        """获取漫画列表"""
+        """获取漫画列表（优先读取元数据缓存，返回副本供调用方打乱/弹出）"""
+        cached = _metadata_cache.get('rank:0:1', METADATA_TTL['rank'])
+        if cached:
+            return list(cached)
+
         url = f"{API_BASE}/comic/rank/list"
         params = {
             'tag_id': '0',
@@ -61,200 +109,408 @@ class ZaimanhuaAppReader:
             '_v': '2.2.5'
         }
         try:
-            resp = requests.get(url, headers=self.headers, params=params, timeout=10)
+            resp = http_get(url, headers=self.headers, params=params)
             if resp.status_code == 200:
                 data = resp.json()
                 if data.get('errno') == 0:
                     data_obj = data.get('data')
+                    comics = []
                     if isinstance(data_obj, dict):
-                        return data_obj.get('data', [])
+                        comics = data_obj.get('data', [])
                     elif isinstance(data_obj, list):
-                        return data_obj
+                        comics = data_obj
+                    if comics:
+                        _metadata_cache.set('rank:0:1', comics)
+                    return list(comics)
             print(f"获取漫画列表失败: {resp.text[:100]}")
         except Exception as e:
             print(f"获取漫画列表出错: {e}")
         return []
 
     def get_chapter_list(self, comic_id):
-        """获取漫画章节"""
+        """获取当前账号可读的漫画章节（优先读取元数据缓存）
+
+        缓存保存未过滤的卷/章节数据（所有账号共享），读取后再按 canRead 过滤，
+        不把某个账号过滤后的章节列表（VIP、已购章节）写入共享缓存。
+        """
+        cache_key = f'volumes:{comic_id}'
+        volumes = _metadata_cache.get(cache_key, METADATA_TTL['detail'])
+        if not volumes:
+            volumes = self._fetch_volumes(comic_id, cache_key)
+
+        all_chapters = []
+        for volume in volumes or []:
+            if 'data' in volume and isinstance(volume['data'], list):
+                for chapter in volume['data']:
+                    if chapter.get('canRead', True):
+                        all_chapters.append(chapter)
+        return all_chapters
+
+    def _fetch_volumes(self, comic_id, cache_key):
+        """请求漫画详情，返回卷列表（含各章节），成功时写入元数据缓存"""
         url = f"{API_BASE}/comic/detail/{comic_id}"
         params = {'_v': '2.2.5'}
         try:
-            resp = requests.get(url, headers=self.headers, params=params, timeout=10)
+            resp = http_get(url, headers=self.headers, params=params)
             if resp.status_code == 200:
                 data = resp.json()
                 if data.get('errno') == 0:
                     inner_data = data.get('data', {}).get('data', {})
                     volumes = inner_data.get('chapters', [])
-                    all_chapters = []
-                    for volume in volumes:
-                        if 'data' in volume and isinstance(volume['data'], list):
-                            for chapter in volume['data']:
-                                if chapter.get('canRead', True):
-                                    all_chapters.append(chapter)
-                    return all_chapters
+                    if volumes:
+                        _metadata_cache.set(cache_key, volumes)
+                    return volumes
             print(f"获取章节列表失败 {comic_id}: {resp.text[:100]}")
         except Exception as e:
             print(f"获取章节列表出错: {e}")
         return []
 
     def get_chapter_images(self, comic_id, chapter_id):
-        """获取章节图片"""
+        """获取章节图片（优先读取元数据缓存）"""
+        cache_key = f'chapter:{comic_id}/{chapter_id}'
+        cached = _metadata_cache.get(cache_key, METADATA_TTL['chapter'])
+        if cached:
+            return cached
+
         url = f"{API_BASE}/comic/chapter/{comic_id}/{chapter_id}"
         params = {'_v': '2.2.5'}
         try:
-            resp = requests.get(url, headers=self.headers, params=params, timeout=10)
+            resp = http_get(url, headers=self.headers, params=params)
             if resp.status_code == 200:
                 data = resp.json()
                 if data.get('errno') == 0:
                     chapter_data = data.get('data', {}).get('data', {})
                     images = chapter_data.get('images') or chapter_data.get('page_url')
+                    if images:
+                        _metadata_cache.set(cache_key, images)
                     return images
             print(f"获取图片列表失败 {comic_id}/{chapter_id}")
         except Exception as e:
             print(f"获取图片列表出错: {e}")
         return []
 
+    def read_page(self, img_url):
+        """读取一页图片，返回实际接收的字节数
+
+        range 模式只请求第 1 个字节，连接可继续复用；CDN 忽略 Range 返回完整图片时，
+        读完响应头立即关闭连接，不下载图片内容。节省的字节数按图片总大小估算。
+        """
+        if self.read_mode == 'full':
+            resp = http_get(img_url, headers=self.headers)
+            received = len(resp.content)
+            self.bytes_received += received
+            return received
+
+        headers = dict(self.headers, Range='bytes=0-0')
+        resp = http_get(img_url, headers=headers, stream=True)
+        try:
+            if resp.status_code == 206:
+                received = len(resp.content)
+                match = re.search(r'/(\d+)$', resp.headers.get('Content-Range', ''))
+                total = int(match.group(1)) if match else received
+            else:
+                received = 0
+                total = int(resp.headers.get('Content-Length') or 0)
+        finally:
+            resp.close()
+
+        self.bytes_received += received
+        self.bytes_saved += max(total - received, 0)
+        return received
+
+    def fallback_if_ineffective(self):
+        """省流模式累计阅读超过 CHEAP_MODE_GRACE_MINUTES 仍未完成任务时切换为完整下载
+
+        返回是否发生了切换。结论会保存到本地，之后的运行直接使用完整下载。
+        """
+        if self.read_mode == 'full' or self.cheap_read_seconds < CHEAP_MODE_GRACE_MINUTES * 60:
+            return False
+        print(f"省流模式已阅读 {self.cheap_read_seconds / 60:.1f} 分钟任务仍未完成，切换为完整下载")
+        _read_mode_store.set('range_ineffective', True)
+        self.read_mode = 'full'
+        return True
+
+    def record_task_completed(self):
+        """任务在省流模式下完成，清除"省流模式无效"的记录"""
+        if self.read_mode == 'range':
+            _read_mode_store.delete('range_ineffective')
+
     def simulate_reading(self, minutes=1):
-        """模拟阅读指定时长（分钟）"""
-        print(f"开始模拟阅读 {minutes} 分钟...")
+        """模拟阅读指定时长（分钟）
+
+        漫画/章节/图片列表由后台 ReadingPrefetcher 预先准备，前台只负责按节奏翻页；
+        时间到时未读完的章节和当前页的剩余阅读时间保留到下一次调用继续。
+        """
+        if self.debug:
+            print(f"开始模拟阅读 {minutes * 60:.0f} 秒...")
         
         start_time = time.time()
         end_time = start_time + (minutes * 60)
-        
-        comics = self.get_comic_list()
-        if not comics:
-            print("未找到任何漫画。" )
-            return False
-            
-        random.shuffle(comics)
+
+        if self._prefetcher is None:
+            self._prefetcher = ReadingPrefetcher(self)
+            self._prefetcher.start()
+
         total_images_read = 0
+        saved_before = self.bytes_saved
         
         while time.time() < end_time:
+            # 当前页尚未读完（可能是上一个时间片留下的）
+            wait = min(self._page_until, end_time) - time.time()
+            if wait > 0:
+                tracing.sleep(wait, 'read.page_wait')
+                continue
+
+            if not self._pending_images:
+                entry = self._prefetcher.get(timeout=max(end_time - time.time(), 0))
+                if entry is None:
+                    if self._prefetcher.exhausted:
+                        print("未找到可阅读的漫画。")
+                        return False
+                    break
+                comic_name, chapter_id, images = entry
+                if self.debug:
+                    print(f"DEBUG: 阅读 {comic_name} 章节 {chapter_id} ({len(images)} 页)")
+                self._pending_images = list(images)
+
+            img_url = self._pending_images.pop(0)
+            try:
+                self.read_page(img_url)
+                total_images_read += 1
+            except: pass
+            
+            # 模拟每页阅读时间
+            sleep_time = PAGE_READ_TIME + random.uniform(-1, 2) if PAGE_READ_TIME >= 2 else PAGE_READ_TIME
+            self._page_until = time.time() + sleep_time
+            
+        if self.read_mode == 'range':
+            self.cheap_read_seconds += time.time() - start_time
+            saved_mb = (self.bytes_saved - saved_before) / 1024 / 1024
+            if self.debug:
+                print(f"本次阅读结束，阅读了 {total_images_read} 页（省流模式，节省约 {saved_mb:.1f} MB）。" )
+        elif self.debug:
+            print(f"本次阅读结束，阅读了 {total_images_read} 页。" )
+        self.pages_read += total_images_read
+        return True
+
+    def close(self):
+        """停止后台预取线程"""
+        if self._prefetcher is not None:
+            self._prefetcher.stop()
+            self._prefetcher = None
+
+
+class ReadingPrefetcher:
+    """后台预取待阅读的 (漫画名, 章节ID, 图片列表)
+
+    生产者线程依次挑选漫画、章节并获取图片列表，跳过没有可读章节或图片的漫画，
+    把可以直接阅读的条目放入长度为 PREFETCH_QUEUE_SIZE 的队列；前台翻页时不再等待元数据请求。
+    整轮漫画都取不到可读章节时（接口异常、熔断等）退避后再试，连续 PREFETCH_MAX_EMPTY_PASSES 轮后停止。
+    """
+
+    def __init__(self, reader):
+        self.reader = reader
+        self.queue = queue.Queue(maxsize=PREFETCH_QUEUE_SIZE)
+        self.exhausted = False  # 漫画列表为空或连续多轮没有可读章节，无法继续预取
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=inherit_output(self._run), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def get(self, timeout):
+        """取出一个待阅读条目，超时或预取结束时返回 None"""
+        deadline = time.time() + timeout
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return None
+            try:
+                return self.queue.get(timeout=min(remaining, 1))
+            except queue.Empty:
+                if self.exhausted:
+                    return None
+
+    def _put(self, entry):
+        while not self._stop.is_set():
+            try:
+                self.queue.put(entry, timeout=1)
+                return
+            except queue.Full:
+                continue
+
+    def _run(self):
+        comics = []
+        queued = True  # 上一轮是否放入过条目（第一轮前视为是）
+        empty_passes = 0
+        while not self._stop.is_set():
             if not comics:
-                comics = self.get_comic_list()
-                if not comics: break
+                if queued:
+                    empty_passes = 0
+                else:
+                    empty_passes += 1
+                    if empty_passes >= PREFETCH_MAX_EMPTY_PASSES:
+                        print(f"连续 {empty_passes} 轮未找到可阅读的章节，停止预取")
+                        self.exhausted = True
+                        return
+                    if self._stop.wait(PREFETCH_EMPTY_BACKOFF * 2 ** (empty_passes - 1)):
+                        return
+                queued = False
+                comics = self.reader.get_comic_list()
+                if not comics:
+                    self.exhausted = True
+                    return
                 random.shuffle(comics)
-                
+
             comic = comics.pop()
             comic_id = comic.get('comic_id')
             comic_name = comic.get('title', '未知')
-            
-            chapters = self.get_chapter_list(comic_id)
+
+            chapters = self.reader.get_chapter_list(comic_id)
             if not chapters: continue
-                
+
             chapter = random.choice(chapters)
             chapter_id = chapter.get('chapter_id')
-            
-            images = self.get_chapter_images(comic_id, chapter_id)
+
+            images = self.reader.get_chapter_images(comic_id, chapter_id)
             if not images: continue
-                
-            for i, img_url in enumerate(images):
-                if time.time() >= end_time: break
-                try:
-                    requests.get(img_url, headers=self.headers, timeout=10)
-                    total_images_read += 1
-                except: pass
-                
-                # 模拟每页阅读时间
-                sleep_time = PAGE_READ_TIME + random.uniform(-1, 2)
-                if minutes < 0.5: sleep_time = 0.5 # 快速测试模式
-                time.sleep(sleep_time)
-            
-            time.sleep(2)
-            
-        print(f"本次阅读结束，阅读了 {total_images_read} 页。" )
-        return True
 
-def try_ui_claim(cookie_str):
-    """尝试使用 Playwright UI 领取奖励"""
-    print("启动浏览器尝试 UI 领取...")
-    with sync_playwright() as p:
-        browser, context, page = create_browser_context(p, cookie_str)
-        try:
-            success = claim_rewards(page, cookie_str)
-            return success
-        except Exception as e:
-            print(f"UI 领取出错: {e}")
-            return False
-        finally:
-            browser.close()
+            self._put((comic_name, chapter_id, images))
+            queued = True
 
-def run_auto_read():
-    parser = argparse.ArgumentParser(description='Zaimanhua Auto Read Script')
-    parser.add_argument('--max-minutes', type=int, default=30, help='最大阅读时长（分钟）')
-    parser.add_argument('--debug', action='store_true', help='开启调试日志')
-    args = parser.parse_args()
 
-    MAX_MINUTES = args.max_minutes
+class ReadPacer:
+    """根据历史完成耗时决定阅读时间片长度
+
+    记录每个账号从开始阅读到任务 13 变为可领取所用的阅读秒数（保留最近 TIMING_SAMPLES 次），
+    以中位数作为预计完成时间：距离较远时每 POLL_INTERVAL_FAR 秒检查一次状态，
+    进入预计完成时间前 POLL_NEAR_WINDOW 秒后改为每 POLL_INTERVAL_NEAR 秒检查一次。
+    """
+
+    def __init__(self, account_key):
+        self.account_key = account_key
+        samples = _read_timing_store.get(account_key) or []
+        self.samples = [x for x in samples if isinstance(x, (int, float))]
+        self.expected = sorted(self.samples)[len(self.samples) // 2] if self.samples else None
+
+    def next_slice(self, elapsed):
+        """返回下一次检查任务状态前应阅读的秒数"""
+        if self.expected is None:
+            return POLL_INTERVAL_FAR
+        until_near = self.expected - POLL_NEAR_WINDOW - elapsed
+        if until_near > 0:
+            return min(POLL_INTERVAL_FAR, until_near)
+        return POLL_INTERVAL_NEAR
+
+    def record(self, elapsed):
+        """记录一次完整阅读的完成耗时"""
+        self.samples = (self.samples + [round(elapsed, 1)])[-TIMING_SAMPLES:]
+        _read_timing_store.set(self.account_key, self.samples)
+
+
+def try_ui_claim(account):
+    """领取奖励：先走 API，失败时才启动浏览器通过 UI 领取"""
+    try:
+        return claim_rewards(None, account)
+    except Exception as e:
+        print(f"UI 领取出错: {e}")
+        return False
+
+def read_account(account, max_minutes, debug=False):
+    """单账号阅读流程：检查任务 13 状态 → 阅读直至完成 → 领取奖励"""
     TASK_ID = 13 # 海螺小姐 (阅读10分钟)
 
-    cookies_list = get_all_cookies()
-    if not cookies_list:
-        print("未发现 Cookie 记录。" )
+    print(f"\n{'='*60}")
+    print(f"账号: {account.label}")
+    print(f"{'='*60}")
+
+    # 验证 Cookie 有效性
+    is_valid, error_msg = validate_cookie(account)
+    if not is_valid:
+        print(f"[ERROR] Cookie 无效: {error_msg}")
+        print(f"请更新 {account.label} 的 Cookie")
         return False
-        
-    for label, cookie_str in cookies_list:
-        print(f"\n{'='*60}")
-        print(f"账号: {label}")
-        print(f"{'='*60}")
-
-        # 验证 Cookie 有效性
-        from utils import validate_cookie
-        is_valid, error_msg = validate_cookie(cookie_str)
-        if not is_valid:
-            print(f"[ERROR] Cookie 无效: {error_msg}")
-            print(f"请更新 {label} 的 Cookie")
-            continue
-
-        reader = ZaimanhuaAppReader(cookie_str, debug=args.debug)
-        token = reader.get_token()
-        if not token:
-            print("Token 无效，跳过该账号。")
-            continue
-        
-        # 1. 初始检查
-        status = reader.get_task_status(TASK_ID)
-        
-        # 根据用户确认：Status 2 = 可领取，Status 3 = 已完成
-        if status == 3:
-            print(f"任务 {TASK_ID} 已完成 (Status 3)。")
-            # 顺便检查其他奖励
-            try_ui_claim(cookie_str)
-            continue
-            
-        elif status == 2:
-             print(f"任务 {TASK_ID} 处于“可领取”状态 (Status 2)。尝试领取...")
-             success, res = claim_task_reward(token, TASK_ID)
-             if success:
-                 print(f"API 领取成功！")
+
+    reader = ZaimanhuaAppReader(account, debug=debug)
+    token = reader.get_token()
+    if not token:
+        print("Token 无效，跳过该账号。")
+        return True
+
+    # 1. 初始检查（复用验证 Cookie 时获取的任务列表）
+    status = reader.get_task_status(TASK_ID, fresh=False)
+
+    # 根据用户确认：Status 2 = 可领取，Status 3 = 已完成
+    if status == 3:
+        print(f"任务 {TASK_ID} 已完成 (Status 3)。")
+        # 顺便检查其他奖励
+        try_ui_claim(account)
+        return True
+
+    elif status == 2:
+         print(f"任务 {TASK_ID} 处于“可领取”状态 (Status 2)。尝试领取...")
+         success, res = claim_task_reward(token, TASK_ID)
+         if success:
+             print(f"API 领取成功！")
+             status = 3
+         else:
+             print(f"API 领取失败 (响应: {res})。尝试切换到 UI 领取模式...")
+             if try_ui_claim(account):
+                 print("UI 领取成功！")
                  status = 3
              else:
-                 print(f"API 领取失败 (响应: {res})。尝试切换到 UI 领取模式...")
-                 if try_ui_claim(cookie_str):
-                     print("UI 领取成功！")
-                     status = 3
-                 else:
-                     print("UI 领取也失败了，可能需要继续阅读？")
-                     
-        elif status is None:
-            print(f"无法确定任务 {TASK_ID} 的状态，跳过阅读。")
-            continue
-            
+                 print("UI 领取也失败了，可能需要继续阅读？")
+
+    elif status is None:
+        print(f"无法确定任务 {TASK_ID} 的状态，跳过阅读。")
+        return True
+
+    try:
         if status != 3:
             print(f"任务 {TASK_ID} 尚未结束 (Status {status})，开始阅读循环。")
-            # 2. 阅读循环
-            for m in range(1, MAX_MINUTES + 1):
-                print(f"\n--- 第 {m}/{MAX_MINUTES} 分钟 ---")
-                reader.simulate_reading(minutes=1)
-                
-                # 每分钟检查一次状态
+            pacer = ReadPacer(reader.account_key)
+            if pacer.expected:
+                print(f"历史完成耗时约 {pacer.expected / 60:.1f} 分钟，接近时加密状态检查")
+            # 仅当本次从未完成状态开始阅读时，完成耗时才有参考价值
+            measure = status == 1
+            # 2. 阅读循环：按 ReadPacer 给出的时间片阅读，每片结束检查任务状态
+            max_seconds = max_minutes * 60
+            elapsed = 0.0
+            next_report = 60
+            new_status = status
+            while elapsed < max_seconds:
+                slice_seconds = min(pacer.next_slice(elapsed), max_seconds - elapsed)
+                slice_start = time.time()
+                with tracing.span('read.slice', seconds=round(slice_seconds, 1)):
+                    has_comics = reader.simulate_reading(minutes=slice_seconds / 60)
+                if not has_comics:
+                    print("没有可阅读的漫画，结束阅读。")
+                    break
+                elapsed += time.time() - slice_start
+
+                if elapsed >= next_report:
+                    print(f"已阅读 {elapsed / 60:.1f} 分钟，共 {reader.pages_read} 页")
+                    next_report += 60
+
                 new_status = reader.get_task_status(TASK_ID)
-                
+
+                if new_status in (2, 3):
+                    if measure:
+                        print(f"\n任务 {TASK_ID} 在阅读 {elapsed / 60:.1f} 分钟后完成。")
+                        reader.record_task_completed()
+                        pacer.record(elapsed)
+                        measure = False
+                else:
+                    reader.fallback_if_ineffective()
+
                 if new_status == 3:
                      print(f"\n任务 {TASK_ID} 已变成 Status 3 (已完成)。")
                      break
-                
+
                 if new_status == 2:
                     print(f"状态为 2 (可领取)。尝试领取...")
                     success, res = claim_task_reward(token, TASK_ID)
@@ -263,20 +519,48 @@ def run_auto_read():
                         break
                     else:
                         print(f"API 领取失败 (响应: {res})。尝试 UI 领取...")
-                        if try_ui_claim(cookie_str):
+                        if try_ui_claim(account):
                             print("UI 领取成功！任务结束。")
                             break
                         else:
                             print("UI 领取失败，继续阅读...")
+            else:
+                print(f"\n已达到最大阅读时长 {max_minutes} 分钟，任务仍未完成 (Status {new_status})。")
+    finally:
+        reader.close()
 
-                if m == MAX_MINUTES:
-                    print(f"\n已达到最大阅读时长 {MAX_MINUTES} 分钟，任务仍未完成 (Status {new_status})。")
+    if reader.bytes_saved:
+        print(f"省流阅读共节省约 {reader.bytes_saved / 1024 / 1024:.1f} MB 流量")
 
-        # 3. 结束前再次尝试 UI 领取所有奖励
-        # try_ui_claim(cookie_str)
-            
+    # 3. 结束前再次尝试 UI 领取所有奖励
+    # try_ui_claim(account)
     return True
 
+def run_auto_read(accounts=None, max_minutes=30, debug=False):
+    """所有账号执行阅读任务"""
+    if accounts is None:
+        accounts = get_all_accounts()
+    if not accounts:
+        print("未发现 Cookie 记录。" )
+        return False
+
+    def job(account):
+        return read_account(account, max_minutes, debug=debug)
+
+    success = run_accounts(accounts, job)
+
+    _metadata_cache.flush()
+    print(f"元数据缓存: 命中 {_metadata_cache.hits} 次，未命中 {_metadata_cache.misses} 次")
+    return success
+
+def main():
+    parser = argparse.ArgumentParser(description='Zaimanhua Auto Read Script')
+    parser.add_argument('--max-minutes', type=int, default=30, help='最大阅读时长（分钟）')
+    parser.add_argument('--debug', action='store_true', help='开启调试日志')
+    args = parser.parse_args()
+
+    return run_auto_read(max_minutes=args.max_minutes, debug=args.debug)
+
 if __name__ == "__main__":
-    success = run_auto_read()
+    success = main()
     exit(0 if success else 1)
\ No newline at end of file
@@ -0,0 +1,298 @@
+"""共享浏览器管理
+
+整次运行只启动一次 Chromium，每个账号通过 new_context() 获得相互隔离的上下文
+（Cookie、localStorage 互不影响），账号结束时只关闭上下文，不关闭浏览器。
+
+Playwright 同步 API 不能跨线程使用，因此浏览器按工作线程维护：
+串行执行时整次运行只有一个 Chromium 进程，并发执行时进程数等于并发数，
+而不是账号数 × 重试次数。线程结束时由 runner 调用 close_thread_browser() 回收。
+
+上下文默认按 BLOCK_PROFILES 拦截脚本用不到的资源（图片、字体、统计脚本等），
+各流程通过 block_profile / allow_types 放行自己需要的资源；
+设置 ZAIMANHUA_BLOCK_RESOURCES=0 可关闭拦截。
+
+需要多次尝试的流程（如签到重试）通过 page_session() 在尝试之间复用同一个上下文，
+每次只重建页面；运行汇总中输出浏览器启动次数、复用次数和估计节省的时间。
+
+Playwright 在第一次需要浏览器时才导入，纯 API 流程不会加载 Playwright 也不会启动 Chromium；
+本机未安装 Chromium 时自动执行一次 `playwright install chromium` 后重试。
+"""
+import os
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import tracing
+from runner import register_run_summary, register_thread_cleanup
+
+# 配置
+PAGE_TIMEOUT = 60000
+DESKTOP_UA = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# 统计/广告脚本，任何流程都不需要
+TRACKER_URL_PATTERNS = (
+    'hm.baidu.com',
+    'cnzz.com',
+    'umeng.com',
+    'google-analytics.com',
+    'googletagmanager.com',
+    'doubleclick.net',
+    'sentry.io',
+)
+
+# 拦截配置: 资源类型 + URL 关键字
+BLOCK_PROFILES = {
+    # 只读 DOM 文本、点击按钮的页面（www 首页、i. 用户中心）
+    'page': {
+        'types': {'image', 'media', 'font'},
+        'urls': TRACKER_URL_PATTERNS,
+    },
+    # 活动页依赖图片/canvas 素材渲染按钮和转盘，只拦截统计脚本
+    'activity': {
+        'types': set(),
+        'urls': TRACKER_URL_PATTERNS,
+    },
+    'none': None,
+}
+
+_local = threading.local()
+_stats_lock = threading.Lock()
+_stats = {
+    'launches': 0, 'launch_seconds': 0.0, 'browser_reuses': 0,
+    'contexts': 0, 'context_seconds': 0.0, 'context_reuses': 0,
+    'blocked': 0,
+}
+_install_lock = threading.Lock()
+_install_attempted = False
+
+
+def _blocking_enabled():
+    return os.environ.get('ZAIMANHUA_BLOCK_RESOURCES', '1').lower() not in ('0', 'false', 'no', 'off')
+
+
+def apply_block_profile(context, profile='page', allow_types=()):
+    """按配置拦截上下文中的资源请求
+
+    Args:
+        profile: BLOCK_PROFILES 中的配置名
+        allow_types: 在该配置基础上额外放行的资源类型
+    """
+    config = BLOCK_PROFILES.get(profile)
+    if not config or not _blocking_enabled():
+        return
+
+    blocked_types = set(config['types']) - set(allow_types)
+    url_patterns = config['urls']
+
+    def handle(route):
+        request = route.request
+        url = request.url
+        if request.resource_type in blocked_types or any(p in url for p in url_patterns):
+            with _stats_lock:
+                _stats['blocked'] += 1
+            route.abort()
+        else:
+            route.continue_()
+
+    context.route('**/*', handle)
+
+
+def get_browser():
+    """获取当前线程的 Chromium 实例，首次调用时启动"""
+    browser = getattr(_local, 'browser', None)
+    if browser is not None and browser.is_connected():
+        with _stats_lock:
+            _stats['browser_reuses'] += 1
+        return browser
+
+    if getattr(_local, 'playwright', None) is None:
+        from playwright.sync_api import sync_playwright
+        _local.playwright = sync_playwright().start()
+    print("启动 Chromium...")
+    start = time.perf_counter()
+    with tracing.span('browser.launch'):
+        try:
+            _local.browser = _local.playwright.chromium.launch(headless=True)
+        except Exception as e:
+            if "Executable doesn't exist" not in str(e) or not _install_chromium():
+                raise
+            _local.browser = _local.playwright.chromium.launch(headless=True)
+    with _stats_lock:
+        _stats['launches'] += 1
+        _stats['launch_seconds'] += time.perf_counter() - start
+    return _local.browser
+
+
+def _install_chromium():
+    """本机缺少 Chromium 时按需安装（整个进程只尝试一次），返回是否可以重试启动"""
+    global _install_attempted
+    with _install_lock:
+        if _install_attempted:
+            return True
+        _install_attempted = True
+        print("未找到 Chromium，正在执行 playwright install chromium...")
+        result = subprocess.run([sys.executable, '-m', 'playwright', 'install', 'chromium'])
+        return result.returncode == 0
+
+
+def new_context(cookies, user_agent=DESKTOP_UA, block_profile='page', allow_types=(), **kwargs):
+    """在共享浏览器中为账号创建独立上下文并写入 Cookie，按 block_profile 拦截资源
+
+    上下文中新建的页面会记录导航和等待的耗时 span。
+    """
+    browser = get_browser()
+    start = time.perf_counter()
+    with tracing.span('browser.new_context'):
+        context = browser.new_context(user_agent=user_agent, **kwargs)
+        apply_block_profile(context, block_profile, allow_types)
+        if cookies:
+            context.add_cookies(cookies)
+    _new_page = context.new_page
+    context.new_page = lambda *args, **kw: tracing.trace_page(_new_page(*args, **kw))
+    with _stats_lock:
+        _stats['contexts'] += 1
+        _stats['context_seconds'] += time.perf_counter() - start
+    return context
+
+
+@contextmanager
+def browser_page(cookies, user_agent=DESKTOP_UA, timeout=PAGE_TIMEOUT, block_profile='page', **kwargs):
+    """创建上下文和页面，退出时关闭上下文（浏览器保持运行）"""
+    context = new_context(cookies, user_agent=user_agent, block_profile=block_profile, **kwargs)
+    try:
+        page = context.new_page()
+        page.set_default_timeout(timeout)
+        yield page
+    finally:
+        try:
+            context.close()
+        except Exception:
+            pass
+
+
+class PageSession:
+    """在多次尝试之间复用同一个上下文，每次 new_page() 关闭上一个页面并新建一个
+
+    上下文或浏览器已断开时才重新创建，单次尝试失败（选择器超时等）只需重新打开页面。
+    """
+
+    def __init__(self, cookies, timeout=PAGE_TIMEOUT, **kwargs):
+        self.cookies = cookies
+        self.timeout = timeout
+        self.kwargs = kwargs
+        self.context = None
+        self.page = None
+
+    def new_page(self):
+        self._close_page()
+        if self.context is not None:
+            try:
+                self.page = self.context.new_page()
+                with _stats_lock:
+                    _stats['context_reuses'] += 1
+            except Exception as e:
+                print(f"上下文已失效，重新创建: {e}")
+                self.close()
+        if self.page is None:
+            self.context = new_context(self.cookies, **self.kwargs)
+            self.page = self.context.new_page()
+        self.page.set_default_timeout(self.timeout)
+        return self.page
+
+    def _close_page(self):
+        if self.page is not None:
+            try:
+                self.page.close()
+            except Exception:
+                pass
+            self.page = None
+
+    def close(self):
+        self._close_page()
+        if self.context is not None:
+            try:
+                self.context.close()
+            except Exception:
+                pass
+            self.context = None
+
+
+@contextmanager
+def page_session(cookies, user_agent=DESKTOP_UA, timeout=PAGE_TIMEOUT, block_profile='page', **kwargs):
+    """创建可在多次尝试之间复用上下文的 PageSession，退出时关闭上下文（浏览器保持运行）"""
+    session = PageSession(cookies, timeout=timeout, user_agent=user_agent, block_profile=block_profile, **kwargs)
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def extract_all(page, selector, prop='href', visible_only=False):
+    """一次 page.evaluate 取出所有匹配元素的属性值（去重、保持页面顺序）
+
+    逐个调用 get_attribute() / inner_text() 每个元素都是一次与浏览器的往返，元素多时明显变慢；
+    prop 取 DOM 属性而非 HTML 特性，如 href 已解析为绝对地址，也可用 innerText 等。
+    visible_only 为 True 时跳过不可见元素。
+    """
+    return page.evaluate(
+        """([selector, prop, visibleOnly]) => {
+            const seen = new Set();
+            for (const el of document.querySelectorAll(selector)) {
+                if (visibleOnly && !el.getClientRects().length) continue;
+                const value = el[prop];
+                if (value && String(value).trim()) seen.add(String(value).trim());
+            }
+            return [...seen];
+        }""",
+        [selector, prop, visible_only],
+    )
+
+
+def close_thread_browser():
+    """关闭当前线程的浏览器和 Playwright 驱动"""
+    browser = getattr(_local, 'browser', None)
+    playwright = getattr(_local, 'playwright', None)
+    _local.browser = None
+    _local.playwright = None
+    try:
+        if browser is not None:
+            browser.close()
+    except Exception:
+        pass
+    try:
+        if playwright is not None:
+            playwright.stop()
+    except Exception:
+        pass
+
+
+def get_browser_stats():
+    """返回浏览器启动/复用次数、上下文创建/复用次数、各自累计耗时和被拦截的请求数"""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def _run_summary():
+    """run_accounts 汇总: 本次运行的浏览器启动、复用次数和复用估计节省的时间"""
+    before = get_browser_stats()
+
+    def report():
+        after = get_browser_stats()
+        delta = {key: after[key] - before[key] for key in after}
+        if not delta['launches'] and not delta['contexts']:
+            return None
+        # 按本进程平均启动/创建耗时估算复用节省的时间
+        avg_launch = after['launch_seconds'] / after['launches'] if after['launches'] else 0.0
+        avg_context = after['context_seconds'] / after['contexts'] if after['contexts'] else 0.0
+        saved = delta['browser_reuses'] * avg_launch + delta['context_reuses'] * avg_context
+        return (f"浏览器: 启动 {delta['launches']} 次 ({delta['launch_seconds']:.1f}s)，"
+                f"复用 {delta['browser_reuses']} 次；上下文: 新建 {delta['contexts']} 个，"
+                f"复用 {delta['context_reuses']} 次；估计节省 {saved:.1f}s")
+
+    return report
+
+
+register_thread_cleanup(close_thread_browser)
+register_run_summary(_run_summary)
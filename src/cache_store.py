@@ -0,0 +1,200 @@
+"""本地持久化缓存
+
+跨运行保存的小型 JSON 数据（接口探测结果、漫画元数据等）统一放在缓存目录下，
+默认是仓库根目录的 .cache/，可通过 ZAIMANHUA_CACHE_DIR 修改。
+账号的浏览器登录状态放在 .state/（ZAIMANHUA_STATE_DIR），文件权限为 0600。
+"""
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_DIR = os.environ.get('ZAIMANHUA_CACHE_DIR') or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache'
+)
+
+# 含登录凭据的数据（浏览器 storage_state）单独存放，不随 .cache 进入 CI 缓存
+STATE_DIR = os.environ.get('ZAIMANHUA_STATE_DIR') or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.state'
+)
+
+ENDPOINT_COMBO_TTL = 7 * 24 * 3600  # 接口探测结果有效期（秒）
+
+
+def atomic_write_json(path, data):
+    """先写临时文件再替换，避免并发或中断导致文件损坏"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-', suffix='.json')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def read_json(path, default=None):
+    """读取 JSON 文件，不存在或损坏时返回 default"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+class JsonStore:
+    """带过期时间的键值存储，保存为缓存目录下的单个 JSON 文件（线程安全）"""
+
+    def __init__(self, name):
+        self.path = os.path.join(CACHE_DIR, name)
+        self._lock = threading.RLock()
+        self._data = None
+
+    def _load(self):
+        if self._data is None:
+            data = read_json(self.path, {})
+            self._data = data if isinstance(data, dict) else {}
+        return self._data
+
+    def get(self, key, ttl=None):
+        """读取键值，超过 ttl 秒的记录视为不存在"""
+        with self._lock:
+            entry = self._load().get(key)
+        if not isinstance(entry, dict):
+            return None
+        if ttl is not None and time.time() - entry.get('ts', 0) > ttl:
+            return None
+        return entry.get('value')
+
+    def set(self, key, value):
+        """写入键值并立即落盘"""
+        with self._lock:
+            self._load()[key] = {'value': value, 'ts': time.time()}
+            self._save()
+
+    def update(self, key, func):
+        """在锁内读取-修改-写回键值: func(旧值或 None) 返回新值，返回值为 None 时删除"""
+        with self._lock:
+            data = self._load()
+            entry = data.get(key)
+            value = func(entry.get('value') if isinstance(entry, dict) else None)
+            if value is None:
+                data.pop(key, None)
+            else:
+                data[key] = {'value': value, 'ts': time.time()}
+            self._save()
+            return value
+
+    def delete(self, key):
+        """删除键值并立即落盘"""
+        with self._lock:
+            if self._load().pop(key, None) is not None:
+                self._save()
+
+    def _save(self):
+        try:
+            atomic_write_json(self.path, self._data)
+        except Exception as e:
+            print(f"写入缓存失败 ({os.path.basename(self.path)}): {e}")
+
+
+class EndpointCache:
+    """记录一组候选接口组合中第一个成功的组合，下次优先使用（有效期 ENDPOINT_COMBO_TTL）
+
+    组合是由字符串组成的元组（请求方式、接口、参数名等），以列表形式保存在缓存目录下的 JSON 文件中。
+    """
+
+    def __init__(self, name, key, ttl=ENDPOINT_COMBO_TTL):
+        self.key = key
+        self.ttl = ttl
+        self._store = JsonStore(name)
+
+    def cached(self, candidates):
+        """返回未过期且仍在候选列表中的缓存组合，没有时返回 None"""
+        value = self._store.get(self.key, ttl=self.ttl)
+        combo = tuple(value) if isinstance(value, list) else None
+        return combo if combo in candidates else None
+
+    def ordered(self, candidates):
+        """返回 (缓存组合或 None, 缓存组合排在最前面的候选列表)"""
+        cached = self.cached(candidates)
+        rest = [combo for combo in candidates if combo != cached]
+        return cached, ([cached] if cached else []) + rest
+
+    def remember(self, combo):
+        """记录成功的组合（与已缓存的相同且未过期时不写盘）"""
+        if self._store.get(self.key, ttl=self.ttl) != list(combo):
+            self._store.set(self.key, list(combo))
+
+    def forget(self):
+        """缓存的组合失效时删除，下次重新探测"""
+        self._store.delete(self.key)
+
+
+class LRUJsonCache:
+    """带过期时间和容量上限的 LRU 缓存，持久化为缓存目录下的 JSON 文件（线程安全）
+
+    读写都在内存中进行，调用 flush() 或进程退出时才写盘；超过 max_entries 时淘汰最久未使用的记录。
+    """
+
+    def __init__(self, name, max_entries=500):
+        self.path = os.path.join(CACHE_DIR, name)
+        self.max_entries = max_entries
+        self._lock = threading.RLock()
+        self._entries = None
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+        atexit.register(self.flush)
+
+    def _load(self):
+        if self._entries is None:
+            data = read_json(self.path, [])
+            self._entries = OrderedDict()
+            if isinstance(data, list):
+                for item in data:
+                    if isinstance(item, list) and len(item) == 3:
+                        key, ts, value = item
+                        self._entries[key] = (ts, value)
+        return self._entries
+
+    def get(self, key, ttl):
+        """读取未超过 ttl 秒的记录，命中时移到最近使用位置"""
+        with self._lock:
+            entries = self._load()
+            entry = entries.get(key)
+            if entry is None or time.time() - entry[0] > ttl:
+                self.misses += 1
+                return None
+            entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        """写入记录，超出容量时淘汰最久未使用的记录"""
+        with self._lock:
+            entries = self._load()
+            entries[key] = (time.time(), value)
+            entries.move_to_end(key)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+            self._dirty = True
+
+    def flush(self):
+        """有修改时写盘"""
+        with self._lock:
+            if not self._dirty or self._entries is None:
+                return
+            data = [[key, ts, value] for key, (ts, value) in self._entries.items()]
+            try:
+                atomic_write_json(self.path, data)
+                self._dirty = False
+            except Exception as e:
+                print(f"写入缓存失败 ({os.path.basename(self.path)}): {e}")
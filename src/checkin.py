@@ -1,82 +1,97 @@
-import os
-import time
-from playwright.sync_api import sync_playwright
-from dotenv import load_dotenv
-from utils import extract_user_info_from_cookies, claim_task_reward, get_task_list, extract_tasks_from_response
+import retry
+import tracing
+from browser import page_session
+from cache_store import EndpointCache
+from endpoints import I_BASE
+from http_client import http_get, http_post
+from runner import run_accounts
+from utils import get_all_accounts, claim_task_reward, get_task_list, extract_tasks_from_response, validate_cookie
 
 # 配置
 MAX_RETRIES = 5
+RETRY_BASE_DELAY = 5  # 浏览器签到重试的初始等待（秒），之后指数增长
 PAGE_TIMEOUT = 60000  # 60秒
 CHECKIN_TASK_ID = 8  # "到此一游"签到任务
 VIP_TASK_ID = 16     # "VIP福利"每日领取任务
+# 签到按钮调用的接口候选 (请求方式, 接口)；路径为推测，尚未在正式站点确认，失败时回退到浏览器
+SIGN_ENDPOINTS = [
+    ('POST', f'{I_BASE}/lpi/v1/task/sign'),
+    ('GET', f'{I_BASE}/lpi/v1/task/sign'),
+]
 
+# 签到接口探测结果（跨运行持久化）
+_sign_endpoint = EndpointCache('sign_endpoint.json', 'task_sign')
+
+
+def get_checkin_status(account, fresh=False):
+    """返回签到任务的状态（1=未签到, 2=已签到待领取, 3=已领取），获取失败时返回 None"""
+    task_result = get_task_list(account.token, fresh=fresh)
+    if not task_result or task_result.get('errno') != 0:
+        return None
+    for task in extract_tasks_from_response(task_result):
+        if (task.get('id') or task.get('taskId')) == CHECKIN_TASK_ID:
+            return task.get('status')
+    return None
 
-def _make_account_label(default_label, cookie_str):
-    """从 Cookie 中提取用户名，生成带用户名的账号标签"""
-    try:
-        user_info = extract_user_info_from_cookies(cookie_str)
-        if isinstance(user_info, dict):
-            name = user_info.get('nickname') or user_info.get('username')
-            if name:
-                return f"{default_label} ({name})"
-    except Exception:
-        pass
-    return default_label
-
-
-def get_all_cookies():
-    """获取所有账号的 Cookie"""
-    load_dotenv()  # 自动加载 .env 文件（本地测试用）
-
-    cookies_list = []
-
-    # 兼容单账号配置
-    single = os.environ.get('ZAIMANHUA_COOKIE')
-    if single:
-        label = _make_account_label('默认账号', single)
-        cookies_list.append((label, single))
-
-    # 支持多账号配置 ZAIMANHUA_COOKIE_1, _2, _3...
-    i = 1
-    while True:
-        cookie = os.environ.get(f'ZAIMANHUA_COOKIE_{i}')
-        if cookie:
-            label = _make_account_label(f'账号 {i}', cookie)
-            cookies_list.append((label, cookie))
-            i += 1
-        else:
-            break
 
-    return cookies_list
+def _try_sign(combo, token):
+    """用指定组合请求一次签到接口，返回 (是否成功, 响应)"""
+    method, url = combo
+    headers = {'Authorization': f'Bearer {token}', 'Referer': f'{I_BASE}/'}
+    try:
+        with tracing.span('checkin.api', method=method, url=url):
+            if method == 'POST':
+                resp = http_post(url, headers=headers, json={})
+            else:
+                resp = http_get(url, headers=headers)
+        if resp.status_code != 200:
+            return False, {'errmsg': f'HTTP {resp.status_code}'}
+        result = resp.json()
+        errmsg = result.get('errmsg', '') or result.get('message', '')
+        return result.get('errno') == 0 or '已签到' in errmsg, result
+    except Exception as e:
+        return False, {'errmsg': str(e)}
+
+
+def checkin_api(account):
+    """不启动浏览器，直接调用签到接口，并以任务状态确认，返回是否成功
+
+    第一次成功的组合记录到本地缓存，之后只需一次请求。
+    """
+    token = account.token
+    if not token:
+        return False
 
+    cached_combo, candidates = _sign_endpoint.ordered(SIGN_ENDPOINTS)
+    for combo in candidates:
+        success, result = _try_sign(combo, token)
+        if not success:
+            print(f"  签到接口失败 ({combo[0]} {combo[1]}): {result.get('errmsg') or result}")
+            if retry.is_account_problem(result.get('errmsg')):
+                raise retry.PermanentError(result.get('errmsg'))
+            if combo == cached_combo:
+                _sign_endpoint.forget()
+            continue
+        status = get_checkin_status(account, fresh=True)
+        if status in (2, 3):
+            _sign_endpoint.remember(combo)
+            print("API 签到成功！")
+            return True
+        print(f"  签到接口返回成功但任务状态未更新 (status={status})")
 
-def parse_cookies(cookie_str):
-    """解析 Cookie 字符串为 Playwright 格式"""
-    cookies = []
-    for item in cookie_str.split(';'):
-        item = item.strip()
-        if '=' in item:
-            name, value = item.split('=', 1)
-            cookies.append({
-                'name': name.strip(),
-                'value': value.strip(),
-                'domain': '.zaimanhua.com',
-                'path': '/'
-            })
-    return cookies
+    return False
 
 
-def claim_checkin_reward(cookie_str):
+def claim_checkin_reward(account):
     """领取签到任务（到此一游）的积分奖励"""
-    user_info = extract_user_info_from_cookies(cookie_str)
-    token = user_info.get('token') if isinstance(user_info, dict) else None
+    token = account.token
 
     if not token:
         print("无法获取 token，跳过领取积分")
         return False
 
-    # 获取任务列表，检查签到任务状态
-    task_result = get_task_list(token)
+    # 签到刚刚改变了任务状态，需要重新获取任务列表
+    task_result = get_task_list(token, fresh=True)
     if not task_result or task_result.get('errno') != 0:
         print("获取任务列表失败")
         return False
@@ -109,10 +124,9 @@ def claim_checkin_reward(cookie_str):
     return False
 
 
-def claim_vip_reward(cookie_str):
+def claim_vip_reward(account):
     """领取VIP福利的每日积分奖励"""
-    user_info = extract_user_info_from_cookies(cookie_str)
-    token = user_info.get('token') if isinstance(user_info, dict) else None
+    token = account.token
 
     if not token:
         print("无法获取 token，跳过VIP福利领取")
@@ -154,133 +168,122 @@ def claim_vip_reward(cookie_str):
     return False
 
 
-def checkin_once(cookie_str):
-    """执行一次签到尝试"""
-    cookies = parse_cookies(cookie_str)
-    print(f"已解析 {len(cookies)} 个 Cookie")
+def checkin_once(page):
+    """在给定页面上执行一次签到尝试（页面由调用方在各次尝试之间重建）"""
+    try:
+        # 访问页面，增加超时时间
+        page.goto(f'{I_BASE}/', timeout=PAGE_TIMEOUT)
+
+        # 等待页面加载
+        page.wait_for_load_state('networkidle', timeout=PAGE_TIMEOUT)
+        print(f"页面标题: {page.title()}")
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        # 使用真实浏览器 User-Agent
-        context = browser.new_context(
-            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        )
+        # 等待签到按钮出现
+        page.wait_for_selector('.ant-btn-primary', timeout=10000)
 
-        # 添加 Cookie
-        context.add_cookies(cookies)
+        # 获取按钮信息
+        button = page.locator('.ant-btn-primary').first
+        button_text = button.inner_text()
+        is_disabled = button.is_disabled()
 
-        page = context.new_page()
-        page.set_default_timeout(PAGE_TIMEOUT)
+        print(f"按钮文字: {button_text}")
+        print(f"按钮禁用状态: {is_disabled}")
 
+        if is_disabled:
+            # 检查是否已签到（按钮禁用可能意味着已签到）
+            if "已签到" in button_text or "已领取" in button_text:
+                print("今天已经签到过了！")
+                result = True
+            else:
+                # 可能是未登录状态，尝试用 JavaScript 强制点击
+                print("按钮被禁用，尝试使用 JavaScript 点击...")
+                page.evaluate("document.querySelector('.ant-btn-primary').click()")
+                page.wait_for_timeout(2000)
+                print("JavaScript 点击完成")
+                result = True
+        else:
+            # 按钮可用，正常点击
+            button.click()
+            page.wait_for_timeout(2000)
+            print("签到成功！")
+            result = True
+
+    except Exception as e:
+        print(f"签到失败: {e}")
+        # 保存截图用于调试
         try:
-            # 访问页面，增加超时时间
-            page.goto('https://i.zaimanhua.com/', timeout=PAGE_TIMEOUT)
+            page.screenshot(path="error_screenshot.png")
+            print("已保存错误截图: error_screenshot.png")
+        except:
+            pass
+        # 交给 retry_call 按错误类型决定是否重试
+        raise
 
-            # 等待页面加载
-            page.wait_for_load_state('networkidle', timeout=PAGE_TIMEOUT)
-            print(f"页面标题: {page.title()}")
+    return result
 
-            # 等待签到按钮出现
-            page.wait_for_selector('.ant-btn-primary', timeout=10000)
 
-            # 获取按钮信息
-            button = page.locator('.ant-btn-primary').first
-            button_text = button.inner_text()
-            is_disabled = button.is_disabled()
+def checkin(account):
+    """执行签到：已签到时直接返回，优先调用签到接口，失败时才用浏览器重试"""
+    status = get_checkin_status(account)
+    if status in (2, 3):
+        print("今天已经签到过了！")
+        return True
 
-            print(f"按钮文字: {button_text}")
-            print(f"按钮禁用状态: {is_disabled}")
+    print("尝试通过 API 签到...")
+    try:
+        if checkin_api(account):
+            return True
+    except retry.PermanentError as e:
+        print(f"签到失败（无法通过重试解决）: {e}")
+        return False
+    print("API 签到失败，回退到浏览器...")
 
-            if is_disabled:
-                # 检查是否已签到（按钮禁用可能意味着已签到）
-                if "已签到" in button_text or "已领取" in button_text:
-                    print("今天已经签到过了！")
-                    result = True
-                else:
-                    # 可能是未登录状态，尝试用 JavaScript 强制点击
-                    print("按钮被禁用，尝试使用 JavaScript 点击...")
-                    page.evaluate("document.querySelector('.ant-btn-primary').click()")
-                    page.wait_for_timeout(2000)
-                    print("JavaScript 点击完成")
-                    result = True
-            else:
-                # 按钮可用，正常点击
-                button.click()
-                page.wait_for_timeout(2000)
-                print("签到成功！")
-                result = True
+    # 按错误类型退避重试，永久错误或重试预算用完时立即失败；
+    # 各次尝试复用同一个浏览器和上下文，只重新打开页面
+    with page_session(account.site_cookies, timeout=PAGE_TIMEOUT) as session:
+        return bool(retry.retry_call(lambda: checkin_once(session.new_page()), 'checkin',
+                                     attempts=MAX_RETRIES, base_delay=RETRY_BASE_DELAY))
 
-        except Exception as e:
-            print(f"签到失败: {e}")
-            # 保存截图用于调试
-            try:
-                page.screenshot(path="error_screenshot.png")
-                print("已保存错误截图: error_screenshot.png")
-            except:
-                pass
-            result = False
-        finally:
-            browser.close()
-
-        return result
-
-
-def checkin(cookie_str):
-    """执行签到，带重试机制"""
-    for attempt in range(1, MAX_RETRIES + 1):
-        print(f"尝试第 {attempt}/{MAX_RETRIES} 次...")
-        try:
-            if checkin_once(cookie_str):
-                return True
-        except Exception as e:
-            print(f"第 {attempt} 次尝试出错: {e}")
 
-        if attempt < MAX_RETRIES:
-            wait_time = attempt * 10  # 递增等待时间
-            print(f"等待 {wait_time} 秒后重试...")
-            time.sleep(wait_time)
+def checkin_account(account):
+    """单账号签到流程：验证 Cookie → 签到 → 领取签到积分 → 领取VIP福利"""
+    print(f"\n{'='*40}")
+    print(f"正在签到: {account.label}")
+    print('='*40)
+
+    # 验证 Cookie 有效性
+    is_valid, error_msg = validate_cookie(account)
+    if not is_valid:
+        print(f"[ERROR] Cookie 无效: {error_msg}")
+        print(f"请更新 {account.label} 的 Cookie")
+        return False
 
-    print(f"已重试 {MAX_RETRIES} 次，签到失败")
-    return False
+    success = checkin(account)
+    if success:
+        # 签到成功后领取积分
+        print("\n--- 领取签到积分 ---")
+        claim_checkin_reward(account)
+
+        # 领取VIP福利
+        print("\n--- 领取VIP福利 ---")
+        claim_vip_reward(account)
 
+    return success
 
-def main():
-    """主函数，支持多账号签到"""
-    cookies_list = get_all_cookies()
 
-    if not cookies_list:
+def main(accounts=None):
+    """主函数，支持多账号并发签到"""
+    if accounts is None:
+        accounts = get_all_accounts()
+
+    if not accounts:
         print("Error: 未配置任何账号 Cookie")
         print("请设置 ZAIMANHUA_COOKIE 或 ZAIMANHUA_COOKIE_1, ZAIMANHUA_COOKIE_2 等环境变量")
         return False
 
-    print(f"共发现 {len(cookies_list)} 个账号")
-
-    all_success = True
-    for name, cookie_str in cookies_list:
-        print(f"\n{'='*40}")
-        print(f"正在签到: {name}")
-        print('='*40)
-
-        # 验证 Cookie 有效性
-        from utils import validate_cookie
-        is_valid, error_msg = validate_cookie(cookie_str)
-        if not is_valid:
-            print(f"[ERROR] Cookie 无效: {error_msg}")
-            print(f"请更新 {name} 的 Cookie")
-            all_success = False
-            continue
-
-        success = checkin(cookie_str)
-        if success:
-            # 签到成功后领取积分
-            print("\n--- 领取签到积分 ---")
-            claim_checkin_reward(cookie_str)
+    print(f"共发现 {len(accounts)} 个账号")
 
-            # 领取VIP福利
-            print("\n--- 领取VIP福利 ---")
-            claim_vip_reward(cookie_str)
-        else:
-            all_success = False
+    all_success = run_accounts(accounts, checkin_account)
 
     print(f"\n{'='*40}")
     if all_success:
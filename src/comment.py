@@ -1,22 +1,53 @@
 """每日评论自动化"""
 import os
-import time
 import random
-from playwright.sync_api import sync_playwright
+import threading
+import time
+import retry
+import tracing
+from browser import extract_all
+from cache_store import EndpointCache, JsonStore
+from endpoints import V4API_BASE, WWW_BASE
+from http_client import http_get, http_post
+from runner import run_accounts
 from utils import (
-    get_all_cookies,
+    get_all_accounts,
     create_browser_context,
     claim_rewards,
-    init_localstorage,
+    ensure_login,
+    invalidate_storage_state,
     get_task_list,
+    invalidate_task_cache,
     extract_tasks_from_response,
-    extract_user_info_from_cookies,
-    claim_task_reward
+    claim_task_reward,
+    validate_cookie,
 )
 
 # 配置
 MAX_RETRIES = 3
-COMMENTED_COMICS_FILE = "commented_comics.txt"
+RETRY_BASE_DELAY = 5  # 评论重试的初始等待（秒），之后指数增长
+COMMENTED_RETENTION = 90 * 24 * 3600  # 已评论记录保留时长（秒），之后允许再次评论
+COMMENTED_MAX_PER_ACCOUNT = 1000  # 每个账号最多保留的已评论记录数
+LEGACY_COMMENTED_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "commented_comics.txt")
+LEGACY_KEY = '_legacy'
+
+COMMENT_TASK_ID = 14
+COMMENT_SUBMIT_PATH = '/comment/add'  # 网页端评论提交接口路径
+SUBMIT_RESPONSE_TIMEOUT = 10000  # 点击发布后等待提交响应的最长时间（毫秒）
+CONFIRM_BACKOFF = (0, 1, 2, 3)  # 确认任务状态前的等待间隔（秒），任务状态更新后立即结束
+COMMENT_OBJ_TYPE = 4  # 评论对象类型: 4 = 漫画
+# 评论接口候选 (接口, 请求体编码)，网页端使用 JSON；路径为推测，尚未在正式站点确认，失败时回退到浏览器
+COMMENT_API_CANDIDATES = [
+    (f'{V4API_BASE}/app/v1/comment/add', 'json'),
+    (f'{V4API_BASE}/app/v1/comment/add', 'form'),
+]
+
+# 已评论漫画: 账号 -> {漫画ID: 评论时间}
+_commented_store = JsonStore('commented_comics.json')
+_migrate_lock = threading.Lock()
+
+# 评论接口探测结果（跨运行持久化）
+_comment_endpoint = EndpointCache('comment_endpoint.json', 'comment_add')
 
 # 评论内容池 (通用型支持语句)
 COMMENTS = [
@@ -31,37 +62,208 @@ COMMENTS = [
 ]
 
 
-def get_commented_comics():
-    """获取已评论的漫画ID列表"""
+def _prune_commented(comics):
+    """淘汰超过保留时长的记录，超出数量上限时保留最近的"""
+    cutoff = time.time() - COMMENTED_RETENTION
+    comics = {cid: ts for cid, ts in comics.items() if ts >= cutoff}
+    if len(comics) > COMMENTED_MAX_PER_ACCOUNT:
+        recent = sorted(comics.items(), key=lambda item: item[1])[-COMMENTED_MAX_PER_ACCOUNT:]
+        comics = dict(recent)
+    return comics
+
+
+def _migrate_legacy_file():
+    """把旧版所有账号共用的 commented_comics.txt 导入存储（以文件修改时间为评论时间），之后改名为 .migrated"""
+    with _migrate_lock:
+        if not os.path.exists(LEGACY_COMMENTED_FILE):
+            return
+        try:
+            ts = os.path.getmtime(LEGACY_COMMENTED_FILE)
+            with open(LEGACY_COMMENTED_FILE, 'r', encoding='utf-8') as f:
+                legacy = {line.strip(): ts for line in f if line.strip()}
+            _commented_store.update(LEGACY_KEY, lambda old: _prune_commented({**legacy, **(old or {})}))
+            os.replace(LEGACY_COMMENTED_FILE, LEGACY_COMMENTED_FILE + '.migrated')
+            print(f"已迁移旧版评论记录 {len(legacy)} 条")
+        except Exception as e:
+            print(f"迁移旧版评论记录失败: {e}")
+
+
+def get_commented_comics(account):
+    """获取账号已评论的漫画 {漫画ID: 评论时间}（首次使用时继承旧版共用记录）"""
+    _migrate_legacy_file()
+
+    def load(comics):
+        if comics is None:
+            comics = dict(_commented_store.get(LEGACY_KEY) or {})
+        return _prune_commented(comics)
+
     try:
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        file_path = os.path.join(script_dir, COMMENTED_COMICS_FILE)
-        if os.path.exists(file_path):
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return set(line.strip() for line in f if line.strip())
+        stored = _commented_store.get(account.key)
+        comics = load(stored)
+        if stored is None or len(comics) != len(stored):
+            # 继承了旧记录或淘汰了过期记录时才写盘，在锁内重新计算以免覆盖并发写入
+            comics = _commented_store.update(account.key, load)
+        return comics
     except Exception as e:
         print(f"读取已评论记录失败: {e}")
-    return set()
+        return {}
+
 
+def save_commented_comic(account, comic_id):
+    """记录账号已评论的漫画ID"""
+    def add(comics):
+        comics = dict(comics or {})
+        comics[comic_id] = time.time()
+        return _prune_commented(comics)
 
-def save_commented_comic(comic_id):
-    """保存已评论的漫画ID"""
     try:
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        file_path = os.path.join(script_dir, COMMENTED_COMICS_FILE)
-        with open(file_path, 'a', encoding='utf-8') as f:
-            f.write(comic_id + '\n')
+        _commented_store.update(account.key, add)
     except Exception as e:
         print(f"保存评论记录失败: {e}")
 
 
-def post_daily_comment(page, cookie_str):
-    """发表每日评论"""
-    print("\n=== 每日评论任务 ===")
-    
-    # 预检查：手机绑定状态和任务状态
-    user_info = extract_user_info_from_cookies(cookie_str)
-    token = user_info.get('token')
+def get_comic_links(page):
+    """一次性提取页面上的漫画详情链接，返回去重后的 [(comic_id, url), ...]"""
+    comics = {}
+    for url in extract_all(page, "a[href*='/info/']"):
+        # 提取漫画ID (格式: /info/12345/ 或 /info/comic-name.html)
+        comic_id = url.split('/info/')[-1].split('?')[0].rstrip('/').replace('.html', '')
+        if comic_id:
+            comics.setdefault(comic_id, url)
+    return list(comics.items())
+
+
+def get_comment_task_status(token):
+    """重新获取任务列表，返回评论任务的状态，获取失败或未找到时返回 None
+
+    任务状态: 1=未完成, 2=可领取(任务完成等待领取), 3=已完成(已领取)
+    """
+    task_result = get_task_list(token, fresh=True)
+    if not task_result or task_result.get('errno') != 0:
+        return None
+    for task in extract_tasks_from_response(task_result):
+        task_id = task.get('id') or task.get('taskId')
+        task_name = str(task.get('title') or task.get('name') or task.get('taskName', ''))
+        # 任务ID 14 是"每日一评"（评论任务）
+        if task_id == COMMENT_TASK_ID or '评论' in task_name or '一评' in task_name:
+            return task.get('status')
+    return None
+
+
+def wait_comment_task(token):
+    """按 CONFIRM_BACKOFF 短间隔轮询评论任务状态，变为 2/3 时立即返回，否则返回最后一次的状态
+
+    状态仍未更新时丢弃最后一次轮询留下的任务列表快照，之后的 claim_rewards() 会重新获取。
+    """
+    status = None
+    for delay in CONFIRM_BACKOFF:
+        if delay:
+            tracing.sleep(delay, 'comment.confirm_wait')
+        status = get_comment_task_status(token)
+        if status in (2, 3):
+            return status
+    invalidate_task_cache(token)
+    return status
+
+
+def _is_comment_submit(response):
+    return COMMENT_SUBMIT_PATH in response.url and response.request.method == 'POST'
+
+
+def submit_and_wait_response(page, publish_btn):
+    """点击发布并等待评论提交接口的响应，返回响应 JSON；未捕获到提交请求时返回 None"""
+    try:
+        with page.expect_response(_is_comment_submit, timeout=SUBMIT_RESPONSE_TIMEOUT) as response_info:
+            publish_btn.click()
+        response = response_info.value
+        if response.status != 200:
+            return {'errno': response.status, 'errmsg': f'HTTP {response.status}'}
+        return response.json()
+    except Exception as e:
+        print(f"  未捕获到评论提交响应: {e}")
+        return None
+
+
+def get_rank_comic_ids(token):
+    """从排行榜接口获取漫画ID列表（不需要浏览器）"""
+    try:
+        resp = http_get(
+            f'{V4API_BASE}/app/v1/comic/rank/list',
+            headers={'Authorization': f'Bearer {token}'},
+            params={'tag_id': '0', 'page': '1', '_v': '2.2.5'},
+        )
+        data = resp.json().get('data')
+        comics = data.get('data', []) if isinstance(data, dict) else data or []
+        return [str(c.get('comic_id') or c.get('id')) for c in comics if c.get('comic_id') or c.get('id')]
+    except Exception as e:
+        print(f"  获取排行榜失败: {e}")
+        return []
+
+
+def _post_comment_request(combo, token, comic_id, content):
+    """用指定组合发送一次评论请求，返回响应 JSON"""
+    url, encoding = combo
+    payload = {'obj_id': int(comic_id), 'type': COMMENT_OBJ_TYPE, 'content': content}
+    headers = {'Authorization': f'Bearer {token}', 'Referer': f'{WWW_BASE}/'}
+    with tracing.span('comment.api', url=url, encoding=encoding):
+        if encoding == 'json':
+            resp = http_post(url, headers=headers, json=payload)
+        else:
+            resp = http_post(url, headers=headers, data=payload)
+    if resp.status_code != 200:
+        return {'errno': resp.status_code, 'errmsg': f'HTTP {resp.status_code}'}
+    return resp.json()
+
+
+def post_comment_api(account):
+    """不启动浏览器，直接调用评论接口发表评论，返回评论是否已被接口接受
+
+    第一次成功的接口组合记录到本地缓存，之后只需一次请求；失败时由调用方回退到浏览器流程。
+    接口接受评论后即视为成功，任务状态未及时更新时交给 claim_rewards() 领取。
+    """
+    token = account.token
+    commented_comics = get_commented_comics(account)
+    comic_ids = [cid for cid in get_rank_comic_ids(token) if cid.isdigit()]
+    available = [cid for cid in comic_ids if cid not in commented_comics] or comic_ids
+    if not available:
+        print("  未获取到可评论的漫画")
+        return False
+
+    comic_id = random.choice(available)
+    content = random.choice(COMMENTS)
+    print(f"  API 评论漫画 {comic_id}: {content}")
+
+    cached_combo, candidates = _comment_endpoint.ordered(COMMENT_API_CANDIDATES)
+    for combo in candidates:
+        try:
+            result = _post_comment_request(combo, token, comic_id, content)
+        except Exception as e:
+            print(f"  评论接口请求异常 ({combo[1]}): {e}")
+            continue
+        if result.get('errno') != 0:
+            print(f"  评论接口返回失败 ({combo[1]}): {result.get('errmsg')}")
+            if retry.is_account_problem(result.get('errmsg')):
+                raise retry.PermanentError(result.get('errmsg'))
+            if combo == cached_combo:
+                _comment_endpoint.forget()
+            continue
+
+        # 接口已接受评论，立即记录，之后无论任务状态如何都不再重复发表
+        _comment_endpoint.remember(combo)
+        save_commented_comic(account, comic_id)
+        status = wait_comment_task(token)
+        if status in (2, 3):
+            print("  API 评论成功")
+        else:
+            print(f"  API 评论已提交，任务状态尚未更新 (status={status})，领取时将重新获取任务状态")
+        return True
+
+    return False
+
+
+def comment_needed(account):
+    """预检查：评论任务是否已完成、账号是否绑定手机号，返回是否需要打开浏览器评论"""
+    token = account.token
     
     # 检查任务是否已完成
     if token:
@@ -74,67 +276,45 @@ def post_daily_comment(page, cookie_str):
                 if task_id == 14:
                     if task.get('status') == 3:
                         print("  评论任务已完成，无需再次评论")
-                        return True
+                        return False
                     break
     
     # 检查手机绑定
-    phone_bound = user_info.get('bind_phone')
-    # bind_phone 可能是实际号码(188****8888)或空/0
-    is_bound = phone_bound and str(phone_bound) not in ['0', '', 'None', 'False']
-    
-    if not is_bound:
-        print(f"警告: 检测到当前账号未绑定手机号 (bind_phone={phone_bound})")
+    if not account.phone_bound:
+        print(f"警告: 检测到当前账号未绑定手机号 (bind_phone={account.user_info.get('bind_phone')})")
         print("注意: 未绑定手机号的账号无法完成评论任务。为了避免工作流失败，将跳过此任务。")
-        return True
+        return False
+
+    return True
 
+
+def post_daily_comment(page, account):
+    """发表每日评论（调用前先通过 comment_needed() 预检查）"""
     try:
         # 获取已评论的漫画
-        commented_comics = get_commented_comics()
+        commented_comics = get_commented_comics(account)
         print(f"已评论过 {len(commented_comics)} 部漫画")
 
         # 访问首页获取漫画链接
         print("访问首页获取漫画链接...")
-        page.goto('https://www.zaimanhua.com/', wait_until='domcontentloaded')
+        page.goto(f'{WWW_BASE}/', wait_until='domcontentloaded')
         page.wait_for_timeout(3000)
 
-        # 设置 localStorage 确保登录状态
-        init_localstorage(page, cookie_str)
-
-        # 获取所有漫画详情链接
-        comic_links = page.locator("a[href*='/info/']").all()
-        print(f"首页共找到 {len(comic_links)} 个漫画链接")
-
-        # 收集漫画信息并过滤已评论的
-        available_comics = []
-        for link in comic_links:
-            try:
-                href = link.get_attribute('href')
-                if href:
-                    # 提取漫画ID (格式: /info/12345/ 或 /info/comic-name.html)
-                    comic_id = href.split('/info/')[-1].rstrip('/').replace('.html', '')
-                    if comic_id and comic_id not in commented_comics:
-                        full_url = href if href.startswith('http') else 'https://www.zaimanhua.com' + href
-                        available_comics.append((comic_id, full_url))
-            except:
-                continue
-
-        # 去重
-        available_comics = list(set(available_comics))
+        # 确认登录状态（首次写入 localStorage 并保存，之后直接载入）
+        ensure_login(page, account)
+
+        # 获取所有漫画详情链接（一次往返）
+        comic_links = get_comic_links(page)
+        print(f"首页共找到 {len(comic_links)} 部漫画")
+
+        # 过滤已评论的
+        available_comics = [(cid, url) for cid, url in comic_links if cid not in commented_comics]
         print(f"可选择的未评论漫画: {len(available_comics)} 部")
 
         if not available_comics:
             print("所有漫画都已评论过，尝试随机选择一部...")
             # 如果都评论过了，随机选一部（可能会重复）
-            for link in comic_links:
-                try:
-                    href = link.get_attribute('href')
-                    if href:
-                        comic_id = href.split('/info/')[-1].rstrip('/').replace('.html', '')
-                        full_url = href if href.startswith('http') else 'https://www.zaimanhua.com' + href
-                        available_comics.append((comic_id, full_url))
-                except:
-                    continue
-            available_comics = list(set(available_comics))
+            available_comics = comic_links
 
         if not available_comics:
             print("未找到任何漫画链接")
@@ -144,16 +324,9 @@ def post_daily_comment(page, cookie_str):
         comic_id, comic_url = random.choice(available_comics)
         print(f"随机选择漫画: {comic_url} (ID: {comic_id})")
 
-        # 访问漫画详情页
+        # 访问漫画详情页（localStorage 已在同源首页写入，无需再刷新）
         page.goto(comic_url, wait_until='domcontentloaded')
         page.wait_for_timeout(2000)
-
-        # 设置 localStorage 确保登录状态
-        init_localstorage(page, cookie_str)
-
-        # 刷新页面使 localStorage 生效
-        page.reload(wait_until='domcontentloaded')
-        page.wait_for_timeout(2000)
         print(f"漫画页标题: {page.title()}")
 
         # 滚动到评论区
@@ -209,95 +382,50 @@ def post_daily_comment(page, cookie_str):
 
             if publish_btn:
                 print("点击发布按钮...")
-                publish_btn.click()
-                page.wait_for_timeout(3000)
-
-                # 检查是否有错误提示（如需要绑定手机）
-                error_selectors = [
-                    ".el-message--error",
-                    ".error-toast",
-                    ".el-message-box__message",
-                    ".el-message",
-                    "[class*='error']",
-                    "[class*='warn']",
-                    ".toast",
-                ]
-                for selector in error_selectors:
-                    try:
-                        error_els = page.query_selector_all(selector)
-                        for error_el in error_els:
-                            if error_el and error_el.is_visible():
-                                error_text = error_el.inner_text()
-                                if error_text.strip():
-                                    print(f"  检测到提示: {error_text}")
-                    except:
-                        pass
-
-                # 通过任务 API 验证评论是否成功
-                user_info = extract_user_info_from_cookies(cookie_str)
-                token = user_info.get('token') if isinstance(user_info, dict) else None
-
-                if token:
-                    print("验证评论任务状态...")
-                    # 等待服务器更新任务状态
-                    page.wait_for_timeout(3000)
-                    task_result = get_task_list(token)
-                    if task_result and task_result.get('errno') == 0:
-                        tasks = extract_tasks_from_response(task_result)
-                        print(f"  获取到 {len(tasks)} 个任务")
-                        # 查找评论任务（任务ID=14 或 任务名称包含"评论"/"一评"）
-                        comment_task_found = False
-                        for task in tasks:
-                            task_id = task.get('id') or task.get('taskId')
-                            task_name = task.get('title') or task.get('name') or task.get('taskName', '')
-                            # 任务ID 14 是"每日一评"（评论任务）
-                            is_comment_task = (task_id == 14 or
-                                             '评论' in str(task_name) or
-                                             '一评' in str(task_name))
-                            if is_comment_task:
-                                comment_task_found = True
-                                status = task.get('status', 0)
-                                print(f"  找到评论任务: ID={task_id}, 名称={task_name}, 状态={status}")
-                                # 任务状态: 1=未完成, 2=可领取(任务完成等待领取), 3=已完成(已领取)
-                                if status == 3:  # 已完成已领取
-                                    print(f"  评论任务验证成功！状态: 已完成")
-                                    save_commented_comic(comic_id)
-                                    return True
-                                elif status == 2:  # 可领取(任务已完成)
-                                    print(f"  评论任务已完成，尝试领取奖励...")
-                                    success, result = claim_task_reward(token, task_id)
-                                    if success:
-                                        print(f"  奖励领取成功！")
-                                    else:
-                                        print(f"  奖励领取失败: {result}")
-                                    save_commented_comic(comic_id)
-                                    return True
-                                else:
-                                    print(f"  评论任务状态: 未完成，将重试...")
-                                    return False
-                        if not comment_task_found:
-                            print("  未找到评论任务(ID=14)")
+                submit = submit_and_wait_response(page, publish_btn)
+                if submit is not None and submit.get('errno', submit.get('code')) not in (0, None):
+                    errmsg = submit.get('errmsg') or submit.get('message') or submit
+                    print(f"  评论提交失败: {errmsg}")
+                    if retry.is_account_problem(errmsg):
+                        raise retry.PermanentError(errmsg)
+                    return False
+                if submit is not None:
+                    print("  评论提交成功，确认任务状态...")
+
+                token = account.token
+                status = wait_comment_task(token) if token else None
+                if status == 3:
+                    print("  评论任务验证成功！状态: 已完成")
+                    save_commented_comic(account, comic_id)
+                    return True
+                if status == 2:
+                    print("  评论任务已完成，尝试领取奖励...")
+                    success, result = claim_task_reward(token, COMMENT_TASK_ID)
+                    if success:
+                        print("  奖励领取成功！")
                     else:
-                        print(f"  获取任务列表失败")
-                else:
-                    print("  无法获取token，跳过API验证")
-
-                # 如果无法验证任务状态，检查页面错误提示
+                        print(f"  奖励领取失败: {result}")
+                    save_commented_comic(account, comic_id)
+                    return True
+                if submit is not None:
+                    # 提交接口已确认成功，不再重复评论；wait_comment_task() 已丢弃旧快照，领取时重新获取任务状态
+                    print(f"  评论已发表，任务状态尚未更新 (status={status})，领取时将重新获取任务状态")
+                    save_commented_comic(account, comic_id)
+                    return True
+                if status == 1:
+                    print("  评论任务状态: 未完成，将重试...")
+                    return False
+
+                # 未捕获到提交响应且无法确认任务状态时，以页面错误提示判断
                 error_selectors = [".el-message--error", ".error-toast", ".el-message-box__message"]
-                for selector in error_selectors:
-                    error_el = page.query_selector(selector)
-                    if error_el:
-                        try:
-                            if error_el.is_visible():
-                                error_text = error_el.inner_text()
-                                print(f"检测到错误提示: {error_text}")
-                                return False
-                        except:
-                            pass
+                errors = extract_all(page, ', '.join(error_selectors), 'innerText', visible_only=True)
+                if errors:
+                    print(f"检测到错误提示: {errors[0]}")
+                    return False
 
                 # 如果没有错误提示且无法验证API，假设成功（兼容旧行为）
-                print("评论发布成功！（未通过API验证）")
-                save_commented_comic(comic_id)
+                print("评论发布成功！（未通过任务状态验证）")
+                save_commented_comic(account, comic_id)
                 return True
             else:
                 print("未找到发布按钮")
@@ -306,81 +434,81 @@ def post_daily_comment(page, cookie_str):
             print("未找到评论输入框")
             return False
 
+    except retry.PermanentError:
+        raise
     except Exception as e:
         print(f"评论任务失败: {e}")
         return False
 
 
-def run_comment(cookie_str):
+def run_comment(account):
     """执行评论任务"""
-    with sync_playwright() as p:
-        browser, context, page = create_browser_context(p, cookie_str)
+    print("\n=== 每日评论任务 ===")
+    if not comment_needed(account):
+        # 无需评论时不启动浏览器，积分只在 API 领取失败时才打开页面
+        return {'comment': True, 'claim': claim_rewards(None, account)}
 
-        try:
-            # 发表评论
-            comment_result = post_daily_comment(page, cookie_str)
+    # 优先直接调用评论接口，失败时才打开浏览器
+    print("尝试通过 API 发表评论...")
+    if post_comment_api(account):
+        return {'comment': True, 'claim': claim_rewards(None, account)}
+    print("API 评论失败，回退到浏览器...")
 
-            # 领取积分
-            claim_result = claim_rewards(page, cookie_str)
+    context, page = create_browser_context(account)
 
-            return {
-                'comment': comment_result,
-                'claim': claim_result
-            }
+    try:
+        # 发表评论
+        comment_result = post_daily_comment(page, account)
 
-        except Exception as e:
-            print(f"任务执行出错: {e}")
-            return {'comment': False, 'claim': False}
-        finally:
-            browser.close()
+        # 领取积分
+        claim_result = claim_rewards(page, account)
 
+        return {
+            'comment': comment_result,
+            'claim': claim_result
+        }
+
+    except retry.PermanentError:
+        raise
+    except Exception as e:
+        print(f"任务执行出错: {e}")
+        return {'comment': False, 'claim': False}
+    finally:
+        context.close()
 
-def main():
-    """主函数，支持多账号"""
-    cookies_list = get_all_cookies()
 
-    if not cookies_list:
+def comment_account(account):
+    """单账号评论流程，评论失败时重试"""
+    print(f"\n{'='*50}")
+    print(f"正在执行评论任务: {account.label}")
+    print('='*50)
+
+    # 验证 Cookie 有效性
+    is_valid, error_msg = validate_cookie(account)
+    if not is_valid:
+        print(f"[ERROR] Cookie 无效: {error_msg}")
+        print(f"请更新 {account.label} 的 Cookie")
+        invalidate_storage_state(account)
+        return False
+
+    # 评论失败时按错误类型退避重试，账号问题（如未绑定手机号）立即失败
+    return bool(retry.retry_call(lambda: run_comment(account).get('comment') is not False, 'comment',
+                                 attempts=MAX_RETRIES, base_delay=RETRY_BASE_DELAY))
+
+
+def main(accounts=None):
+    """主函数，支持多账号并发"""
+    if accounts is None:
+        accounts = get_all_accounts()
+
+    if not accounts:
         print("Error: 未配置任何账号 Cookie")
         print("请设置 ZAIMANHUA_COOKIE 或 ZAIMANHUA_COOKIE_1 等环境变量")
         return False
 
-    print(f"共发现 {len(cookies_list)} 个账号")
-
-    all_success = True
-    for name, cookie_str in cookies_list:
-        print(f"\n{'='*50}")
-        print(f"正在执行评论任务: {name}")
-        print('='*50)
-
-        # 验证 Cookie 有效性
-        from utils import validate_cookie
-        is_valid, error_msg = validate_cookie(cookie_str)
-        if not is_valid:
-            print(f"[ERROR] Cookie 无效: {error_msg}")
-            print(f"请更新 {name} 的 Cookie")
-            all_success = False
-            continue
-
-        for attempt in range(1, MAX_RETRIES + 1):
-            print(f"\n尝试第 {attempt}/{MAX_RETRIES} 次...")
-            try:
-                results = run_comment(cookie_str)
+    print(f"共发现 {len(accounts)} 个账号")
 
-                if results.get('comment') is False:
-                    if attempt < MAX_RETRIES:
-                        print(f"评论失败，等待重试...")
-                        time.sleep(10)
-                        continue
-                    else:
-                        all_success = False
-                break
-
-            except Exception as e:
-                print(f"第 {attempt} 次尝试出错: {e}")
-                if attempt < MAX_RETRIES:
-                    time.sleep(10)
-                else:
-                    all_success = False
+    all_success = run_accounts(accounts, comment_account)
 
     print(f"\n{'='*50}")
     if all_success:
@@ -10,11 +10,13 @@ import os
 import re
 import time
 
-from utils import extract_user_info_from_cookies, get_all_cookies, parse_cookies
-from playwright.sync_api import sync_playwright
+from browser import new_context
+from endpoints import ACTIVITY_BASE
+from runner import run_accounts
+from utils import get_all_accounts
 
 # 配置
-ACTIVITY_URL = "https://activity.zaimanhua.com/draw-4th/"
+ACTIVITY_URL = f"{ACTIVITY_BASE}/draw-4th/"
 MOBILE_UA = "Mozilla/5.0 (iPhone; CPU iPhone OS 16_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.0 Mobile/15E148 Safari/604.1"
 DEBUG_DIR = "debug"
 
@@ -44,29 +46,17 @@ def save_debug_info(page, prefix):
         print(f"    保存HTML失败: {e}")
 
 
-def create_activity_context(playwright, cookie_str):
-    """创建移动端浏览器上下文（为活动域名设置Cookie）"""
-    cookies = parse_cookies(cookie_str)
-
-    # 为活动域名设置 cookies
-    activity_cookies = []
-    for c in cookies:
-        activity_cookies.append({
-            'name': c['name'],
-            'value': c['value'],
-            'domain': 'activity.zaimanhua.com',
-            'path': '/'
-        })
-
-    browser = playwright.chromium.launch(headless=True)
-    context = browser.new_context(
+def create_activity_context(account):
+    """在共享浏览器中创建移动端上下文（为活动域名设置Cookie），返回 (context, page)"""
+    context = new_context(
+        account.activity_cookies,
         user_agent=MOBILE_UA,
+        block_profile='activity',  # 转盘依赖 canvas 素材
         viewport={'width': 375, 'height': 812}  # iPhone X 尺寸
     )
-    context.add_cookies(activity_cookies)
     page = context.new_page()
 
-    return browser, context, page
+    return context, page
 
 
 def send_blessing(page) -> bool:
@@ -223,80 +213,74 @@ def do_lottery(page) -> int:
     return lottery_count
 
 
-def run_4th_anniversary(cookie_str: str, account_name: str, save_debug: bool = False):
+def run_4th_anniversary(account, save_debug: bool = False):
     """执行单账号的四周年活动流程"""
     print(f"\n  === 开始四周年活动 ===")
 
-    user_info = extract_user_info_from_cookies(cookie_str)
-    username = user_info.get('nickname', user_info.get('username', '未知'))
-    print(f"  用户: {username}")
+    print(f"  用户: {account.nickname or '未知'}")
+    account_name = account.label.replace(' ', '_')
 
-    with sync_playwright() as p:
-        browser, context, page = create_activity_context(p, cookie_str)
+    context, page = create_activity_context(account)
 
-        try:
-            # 1. 访问活动页面
-            print("\n  [1] 访问活动页面...")
-            page.goto(ACTIVITY_URL, wait_until='domcontentloaded', timeout=60000)
-            page.wait_for_timeout(5000)  # 等待页面加载
+    try:
+        # 1. 访问活动页面
+        print("\n  [1] 访问活动页面...")
+        page.goto(ACTIVITY_URL, wait_until='domcontentloaded', timeout=60000)
+        page.wait_for_timeout(5000)  # 等待页面加载
 
-            # 首次运行保存调试信息
-            if save_debug:
-                save_debug_info(page, f"4th_{account_name}_initial")
+        # 首次运行保存调试信息
+        if save_debug:
+            save_debug_info(page, f"4th_{account_name}_initial")
 
-            # 2. 发送祝福
-            print("\n  [2] 发送祝福...")
-            send_blessing(page)
+        # 2. 发送祝福
+        print("\n  [2] 发送祝福...")
+        send_blessing(page)
 
-            # 3. 执行抽奖
-            print("\n  [3] 执行转盘抽奖...")
-            lottery_count = do_lottery(page)
+        # 3. 执行抽奖
+        print("\n  [3] 执行转盘抽奖...")
+        lottery_count = do_lottery(page)
 
-            # 保存最终状态
-            if save_debug:
-                save_debug_info(page, f"4th_{account_name}_final")
+        # 保存最终状态
+        if save_debug:
+            save_debug_info(page, f"4th_{account_name}_final")
 
-            print(f"\n  === 四周年活动完成 ===")
-            print(f"  抽奖次数: {lottery_count}")
+        print(f"\n  === 四周年活动完成 ===")
+        print(f"  抽奖次数: {lottery_count}")
 
-        except Exception as e:
-            print(f"  [x] 活动执行异常: {e}")
-            if save_debug:
-                save_debug_info(page, f"4th_{account_name}_error")
-        finally:
-            browser.close()
+    except Exception as e:
+        print(f"  [x] 活动执行异常: {e}")
+        if save_debug:
+            save_debug_info(page, f"4th_{account_name}_error")
+    finally:
+        context.close()
 
 
-def main():
+def main(accounts=None):
     """主函数"""
     print("=== 四周年活动自动化 ===")
     print(f"活动地址: {ACTIVITY_URL}")
     print(f"活动时间: 2026.1.16 - 2026.1.22\n")
 
-    cookies_list = get_all_cookies()
-    if not cookies_list:
+    if accounts is None:
+        accounts = get_all_accounts()
+    if not accounts:
         print("错误: 请设置 ZAIMANHUA_COOKIE 环境变量")
         return
 
-    print(f"检测到 {len(cookies_list)} 个账号")
+    print(f"检测到 {len(accounts)} 个账号")
 
-    # 首次运行保存调试信息
-    save_debug = True
+    # 只在首个账号保存调试信息
+    first_account = accounts[0]
 
-    for account_name, cookie_str in cookies_list:
+    def activity_account(account):
         print(f"\n{'='*50}")
-        print(f"账号: {account_name}")
+        print(f"账号: {account.label}")
         print('='*50)
 
-        run_4th_anniversary(cookie_str, account_name.replace(' ', '_'), save_debug)
-
-        # 只在首个账号保存调试信息
-        save_debug = False
+        run_4th_anniversary(account, account is first_account)
+        return True
 
-        # 账号间隔
-        if len(cookies_list) > 1:
-            print("\n等待 3 秒后处理下一个账号...")
-            time.sleep(3)
+    run_accounts(accounts, activity_account)
 
     print(f"\n{'='*50}")
     print("所有账号处理完成")
@@ -0,0 +1,37 @@
+"""站点地址
+
+各主机的基础地址集中在这里，均可通过环境变量覆盖，用于把所有脚本指向本地模拟服务器
+(bench/mock_server.py) 做离线测试和基准测试:
+
+    ZAIMANHUA_WWW_BASE        https://www.zaimanhua.com
+    ZAIMANHUA_I_BASE          https://i.zaimanhua.com
+    ZAIMANHUA_V4API_BASE      https://v4api.zaimanhua.com
+    ZAIMANHUA_LUCK_DRAW_BASE  https://luck-draw.zaimanhua.com
+    ZAIMANHUA_ACTIVITY_BASE   https://activity.zaimanhua.com
+"""
+import os
+from urllib.parse import urlsplit
+
+SITE_DOMAIN = 'zaimanhua.com'
+
+
+def _base(name, default):
+    return (os.environ.get(f'ZAIMANHUA_{name}_BASE') or default).rstrip('/')
+
+
+WWW_BASE = _base('WWW', 'https://www.zaimanhua.com')
+I_BASE = _base('I', 'https://i.zaimanhua.com')
+V4API_BASE = _base('V4API', 'https://v4api.zaimanhua.com')
+LUCK_DRAW_BASE = _base('LUCK_DRAW', 'https://luck-draw.zaimanhua.com')
+ACTIVITY_BASE = _base('ACTIVITY', 'https://activity.zaimanhua.com')
+
+
+def cookie_domain(base_url):
+    """只对该主机生效的 Cookie 域"""
+    return urlsplit(base_url).hostname
+
+
+def shared_cookie_domain():
+    """全站共享的 Cookie 域；指向本地模拟服务器时退回为主机名（Cookie 不区分端口）"""
+    host = urlsplit(WWW_BASE).hostname or ''
+    return f'.{SITE_DOMAIN}' if host.endswith(SITE_DOMAIN) else host
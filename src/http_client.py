@@ -0,0 +1,94 @@
+"""共享 HTTP 客户端
+
+所有模块的 API 请求统一经过这里，复用同一个 requests.Session：
+- 每个主机（i./v4api./luck-draw./activity.zaimanhua.com）各自维护 keep-alive 连接池，
+  避免每次请求都重新进行 TCP + TLS 握手
+- 统一默认超时和公共请求头，调用方传入的 headers 会覆盖同名默认值
+- 不保存服务端下发的 Cookie，防止多账号之间串号（鉴权统一走 Bearer token）
+- 每个请求记录一个 http.<方法> 耗时 span
+- 按主机熔断：连续超时、连接失败或 5xx 达到阈值后，冷却期内直接抛出 CircuitOpenError（见 retry.py）
+"""
+import threading
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import retry
+import tracing
+
+# 配置
+DEFAULT_TIMEOUT = 10  # 秒
+POOL_CONNECTIONS = 8   # 缓存的主机连接池数量（每个主机一个池）
+POOL_MAXSIZE = 16      # 每个主机池内最多保持的连接数
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'application/json, text/plain, */*',
+    'Accept-Language': 'zh-CN,zh;q=0.9',
+}
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _create_session():
+    """创建带连接池的 Session"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update(DEFAULT_HEADERS)
+    # 拒绝所有 Set-Cookie，Session 在多账号间共享，不能保留任何账号的 Cookie
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    return session
+
+
+def get_session():
+    """获取全局共享的 Session（懒加载，线程安全）"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _create_session()
+    return _session
+
+
+def http_request(method, url, **kwargs):
+    """发送请求，未指定 timeout 时使用默认超时；主机已熔断时抛出 retry.CircuitOpenError"""
+    kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+    parts = urlsplit(url)
+    breaker = retry.get_breaker(parts.netloc)
+    if not breaker.allow():
+        raise retry.CircuitOpenError(f"{parts.netloc} 暂时熔断，跳过请求")
+    with tracing.span(f'http.{method}', host=parts.netloc, path=parts.path) as attrs:
+        try:
+            resp = get_session().request(method, url, **kwargs)
+        except requests.RequestException:
+            breaker.record_failure()
+            raise
+        attrs['status'] = resp.status_code
+    if retry.classify_response(resp.status_code) == retry.TRANSIENT:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    return resp
+
+
+def http_get(url, **kwargs):
+    """GET 请求"""
+    return http_request('GET', url, **kwargs)
+
+
+def http_post(url, **kwargs):
+    """POST 请求"""
+    return http_request('POST', url, **kwargs)
+
+
+def close_session():
+    """关闭全局 Session 及其连接池"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
@@ -2,13 +2,16 @@
 import hashlib
 import time
 import os
-import requests
 
-from utils import extract_user_info_from_cookies, get_all_cookies, parse_cookies, validate_cookie
-from playwright.sync_api import sync_playwright
+import tracing
+from browser import new_context
+from endpoints import LUCK_DRAW_BASE
+from http_client import http_get
+from runner import run_accounts
+from utils import get_all_accounts, validate_cookie
 
 # 配置
-BASE_URL = "https://luck-draw.zaimanhua.com"
+BASE_URL = LUCK_DRAW_BASE
 SECRET = "pD4vj_159753twt"
 MOBILE_UA = "Mozilla/5.0 (iPhone; CPU iPhone OS 16_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.0 Mobile/15E148 Safari/604.1"
 
@@ -46,7 +49,7 @@ def check_lottery_status(token: str) -> dict:
     params = get_api_params()
 
     try:
-        resp = requests.get(f"{BASE_URL}/drawApi/draw/draw_load", params=params, headers=headers)
+        resp = http_get(f"{BASE_URL}/drawApi/draw/draw_load", params=params, headers=headers)
         result = resp.json()
         return result
     except Exception as e:
@@ -60,7 +63,7 @@ def execute_lottery_api(token: str) -> dict:
     params = get_api_params()
 
     try:
-        resp = requests.get(f"{BASE_URL}/drawApi/draw/drawing", params=params, headers=headers)
+        resp = http_get(f"{BASE_URL}/drawApi/draw/drawing", params=params, headers=headers)
         result = resp.json()
 
         errno = result.get("errno")
@@ -81,160 +84,149 @@ def execute_lottery_api(token: str) -> dict:
         return {}
 
 
-def run_lottery_with_browser(cookie_str: str, token: str):
+def run_lottery_with_browser(account, token: str):
     """使用浏览器执行完整抽奖流程（包括点击任务按钮）"""
     print("\n  === 开始抽奖流程 (浏览器模式) ===")
 
-    cookies = parse_cookies(cookie_str)
-    # 为抽奖域名设置 cookies
-    lottery_cookies = []
-    for c in cookies:
-        lottery_cookies.append({
-            'name': c['name'],
-            'value': c['value'],
-            'domain': 'luck-draw.zaimanhua.com',
-            'path': '/'
-        })
-
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context(
-            user_agent=MOBILE_UA,
-            viewport={'width': 375, 'height': 812}  # iPhone X 尺寸
-        )
-        context.add_cookies(lottery_cookies)
-        page = context.new_page()
-
-        try:
-            # 1. 访问抽奖页面
-            print("\n  [1] 访问抽奖页面...")
-            page.goto(BASE_URL, wait_until='domcontentloaded', timeout=60000)
-            page.wait_for_timeout(5000)
-
-            # 确保在"活动介绍"标签页（第一个标签）
-            tab_items = page.locator(".navTab .tabItem")
-            if tab_items.count() > 0:
-                first_tab = tab_items.first
-                first_tab.click(timeout=3000)
-                page.wait_for_timeout(1500)
-                print("    已切换到活动介绍标签")
-
-            # 滚动到页面底部找到任务区域
-            page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-            page.wait_for_timeout(1000)
-
-            # 2. 获取当前状态
-            print("\n  [2] 获取抽奖状态...")
-            status = check_lottery_status(token)
-            if status.get("errno") != 0:
-                print(f"    获取状态失败: {status}")
-                return
-
-            data = status.get("data", {})
-            times = data.get("times", 0)
-
-            # 使用 xxxTimes 字段判断任务完成状态
-            follow_done = data.get('followTimes', 0) > 0
-            share_done = data.get('shareTimes', 0) > 0
-            read_done = data.get('readTimes', 0) > 0
-
-            print(f"    当前抽奖次数: {times}")
-            print(f"    关注任务: {'已完成' if follow_done else '未完成'}")
-            print(f"    分享任务: {'已完成' if share_done else '未完成'}")
-            print(f"    阅读任务: {'已完成' if read_done else '未完成'}")
-
-            # 3. 点击任务按钮
-            # 活动介绍页面结构: .imgBoxP7 > .btn1 (任务一), .btn2 (任务二), .btn3 (任务三)
-            # 直接根据按钮文本判断是否需要点击
-            print("\n  [3] 执行任务...")
-            initial_times = times
-
-            # 任务一：关注微博
-            print("    [任务一] 关注微博...")
-            follow_btn = page.locator(".imgBoxP7 .btn1")
-            if follow_btn.count() > 0:
-                btn_text = follow_btn.inner_text(timeout=2000).strip()
-                print(f"      按钮文本: '{btn_text}'")
-                if "去完成" in btn_text:
-                    try:
-                        follow_btn.click(timeout=3000)
-                        page.wait_for_timeout(1500)
-                        print("      已点击")
-                    except Exception as e:
-                        print(f"      点击失败: {e}")
-                elif "已完成" in btn_text:
-                    print("      任务已完成")
-            else:
-                print("      未找到按钮")
-
-            # 任务二：分享页面
-            print("    [任务二] 分享页面...")
-            share_btn = page.locator(".imgBoxP7 .btn2")
-            if share_btn.count() > 0:
-                btn_text = share_btn.inner_text(timeout=2000).strip()
-                print(f"      按钮文本: '{btn_text}'")
-                if "去完成" in btn_text:
-                    try:
-                        share_btn.click(timeout=3000)
-                        page.wait_for_timeout(1500)
+    # 抽奖域名的 cookies
+    context = new_context(
+        account.luck_draw_cookies,
+        user_agent=MOBILE_UA,
+        block_profile='activity',  # 任务按钮是图片素材
+        viewport={'width': 375, 'height': 812}  # iPhone X 尺寸
+    )
+    page = context.new_page()
 
-                        # 等待弹窗出现并点击"复制"按钮
-                        copy_btn = page.locator(".copyBtn")
-                        if copy_btn.is_visible(timeout=3000):
-                            copy_btn.click(timeout=3000)
-                            page.wait_for_timeout(1500)
-                            print("      已点击复制按钮")
-                        else:
-                            print("      未找到复制按钮")
-                    except Exception as e:
-                        print(f"      分享任务失败: {e}")
-                elif "已完成" in btn_text:
-                    print("      任务已完成")
-            else:
-                print("      未找到按钮")
-
-            # 任务三：阅读漫画
-            print("    [任务三] 阅读漫画...")
-            read_btn = page.locator(".imgBoxP7 .btn3")
-            if read_btn.count() > 0:
-                btn_text = read_btn.inner_text(timeout=2000).strip()
-                print(f"      按钮文本: '{btn_text}'")
-                if "去完成" in btn_text:
-                    try:
-                        read_btn.click(timeout=3000)
+    try:
+        # 1. 访问抽奖页面
+        print("\n  [1] 访问抽奖页面...")
+        page.goto(BASE_URL, wait_until='domcontentloaded', timeout=60000)
+        page.wait_for_timeout(5000)
+
+        # 确保在"活动介绍"标签页（第一个标签）
+        tab_items = page.locator(".navTab .tabItem")
+        if tab_items.count() > 0:
+            first_tab = tab_items.first
+            first_tab.click(timeout=3000)
+            page.wait_for_timeout(1500)
+            print("    已切换到活动介绍标签")
+
+        # 滚动到页面底部找到任务区域
+        page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+        page.wait_for_timeout(1000)
+
+        # 2. 获取当前状态
+        print("\n  [2] 获取抽奖状态...")
+        status = check_lottery_status(token)
+        if status.get("errno") != 0:
+            print(f"    获取状态失败: {status}")
+            return
+
+        data = status.get("data", {})
+        times = data.get("times", 0)
+
+        # 使用 xxxTimes 字段判断任务完成状态
+        follow_done = data.get('followTimes', 0) > 0
+        share_done = data.get('shareTimes', 0) > 0
+        read_done = data.get('readTimes', 0) > 0
+
+        print(f"    当前抽奖次数: {times}")
+        print(f"    关注任务: {'已完成' if follow_done else '未完成'}")
+        print(f"    分享任务: {'已完成' if share_done else '未完成'}")
+        print(f"    阅读任务: {'已完成' if read_done else '未完成'}")
+
+        # 3. 点击任务按钮
+        # 活动介绍页面结构: .imgBoxP7 > .btn1 (任务一), .btn2 (任务二), .btn3 (任务三)
+        # 直接根据按钮文本判断是否需要点击
+        print("\n  [3] 执行任务...")
+        initial_times = times
+
+        # 任务一：关注微博
+        print("    [任务一] 关注微博...")
+        follow_btn = page.locator(".imgBoxP7 .btn1")
+        if follow_btn.count() > 0:
+            btn_text = follow_btn.inner_text(timeout=2000).strip()
+            print(f"      按钮文本: '{btn_text}'")
+            if "去完成" in btn_text:
+                try:
+                    follow_btn.click(timeout=3000)
+                    page.wait_for_timeout(1500)
+                    print("      已点击")
+                except Exception as e:
+                    print(f"      点击失败: {e}")
+            elif "已完成" in btn_text:
+                print("      任务已完成")
+        else:
+            print("      未找到按钮")
+
+        # 任务二：分享页面
+        print("    [任务二] 分享页面...")
+        share_btn = page.locator(".imgBoxP7 .btn2")
+        if share_btn.count() > 0:
+            btn_text = share_btn.inner_text(timeout=2000).strip()
+            print(f"      按钮文本: '{btn_text}'")
+            if "去完成" in btn_text:
+                try:
+                    share_btn.click(timeout=3000)
+                    page.wait_for_timeout(1500)
+
+                    # 等待弹窗出现并点击"复制"按钮
+                    copy_btn = page.locator(".copyBtn")
+                    if copy_btn.is_visible(timeout=3000):
+                        copy_btn.click(timeout=3000)
                         page.wait_for_timeout(1500)
-                        print("      已点击")
-                    except Exception as e:
-                        print(f"      点击失败: {e}")
-                elif "已完成" in btn_text:
-                    print("      任务已完成")
-            else:
-                print("      未找到按钮")
-
-            # 4. 重新获取状态检查是否有新的抽奖次数
-            page.wait_for_timeout(1000)
-            status = check_lottery_status(token)
-            data = status.get("data", {})
-            times = data.get("times", 0)
-
-            if times > initial_times:
-                print(f"\n    任务完成！抽奖次数: {initial_times} -> {times}")
-
-            # 5. 执行抽奖（通过 API）
-            if times > 0:
-                print(f"\n  [4] 执行抽奖 ({times} 次)...")
-                for i in range(times):
-                    print(f"\n    第 {i+1} 次:")
-                    execute_lottery_api(token)
-                    if i < times - 1:
-                        time.sleep(2)
-            else:
-                print("\n  [!] 没有可用的抽奖次数")
-
-        except Exception as e:
-            print(f"  [x] 浏览器操作异常: {e}")
-        finally:
-            browser.close()
+                        print("      已点击复制按钮")
+                    else:
+                        print("      未找到复制按钮")
+                except Exception as e:
+                    print(f"      分享任务失败: {e}")
+            elif "已完成" in btn_text:
+                print("      任务已完成")
+        else:
+            print("      未找到按钮")
+
+        # 任务三：阅读漫画
+        print("    [任务三] 阅读漫画...")
+        read_btn = page.locator(".imgBoxP7 .btn3")
+        if read_btn.count() > 0:
+            btn_text = read_btn.inner_text(timeout=2000).strip()
+            print(f"      按钮文本: '{btn_text}'")
+            if "去完成" in btn_text:
+                try:
+                    read_btn.click(timeout=3000)
+                    page.wait_for_timeout(1500)
+                    print("      已点击")
+                except Exception as e:
+                    print(f"      点击失败: {e}")
+            elif "已完成" in btn_text:
+                print("      任务已完成")
+        else:
+            print("      未找到按钮")
+
+        # 4. 重新获取状态检查是否有新的抽奖次数
+        page.wait_for_timeout(1000)
+        status = check_lottery_status(token)
+        data = status.get("data", {})
+        times = data.get("times", 0)
+
+        if times > initial_times:
+            print(f"\n    任务完成！抽奖次数: {initial_times} -> {times}")
+
+        # 5. 执行抽奖（通过 API）
+        if times > 0:
+            print(f"\n  [4] 执行抽奖 ({times} 次)...")
+            for i in range(times):
+                print(f"\n    第 {i+1} 次:")
+                execute_lottery_api(token)
+                if i < times - 1:
+                    tracing.sleep(2, 'lottery.draw_wait')
+        else:
+            print("\n  [!] 没有可用的抽奖次数")
+
+    except Exception as e:
+        print(f"  [x] 浏览器操作异常: {e}")
+    finally:
+        context.close()
 
     print("\n  === 抽奖流程结束 ===")
 
@@ -267,7 +259,7 @@ def run_lottery_api_only(token: str):
             print(f"\n    第 {i+1} 次:")
             execute_lottery_api(token)
             if i < times - 1:
-                time.sleep(2)
+                tracing.sleep(2, 'lottery.draw_wait')
     else:
         print("\n  [!] 没有可用的抽奖次数")
         print("       提示: 需要完成任务才能获得抽奖次数")
@@ -275,43 +267,53 @@ def run_lottery_api_only(token: str):
     print("\n  === 抽奖流程结束 ===")
 
 
-def main():
-    """主函数"""
-    print("=== 抽奖任务自动化 ===\n")
+def lottery_account(account) -> bool:
+    """单账号抽奖流程"""
+    print(f"\n{'='*50}")
+    print(f"账号: {account.label}")
+    print('='*50)
 
-    cookies_list = get_all_cookies()
-    if not cookies_list:
-        print("错误: 请设置 ZAIMANHUA_COOKIE 环境变量")
+    # 验证 Cookie 有效性
+    is_valid, error_msg = validate_cookie(account)
+    if not is_valid:
+        print(f"  [ERROR] Cookie 无效: {error_msg}")
+        print(f"  请更新 {account.label} 的 Cookie")
+        return False
+
+    user_info = account.user_info
+    token = account.token
+
+    if not token:
+        print("  错误: Cookie 中未找到 token")
         return False
 
-    all_success = True
-    for account_name, cookie_str in cookies_list:
-        print(f"\n{'='*50}")
-        print(f"账号: {account_name}")
-        print('='*50)
+    print(f"  用户: {user_info.get('nickname', user_info.get('username', '未知'))}")
 
-        # 验证 Cookie 有效性
-        is_valid, error_msg = validate_cookie(cookie_str)
-        if not is_valid:
-            print(f"  [ERROR] Cookie 无效: {error_msg}")
-            print(f"  请更新 {account_name} 的 Cookie")
-            all_success = False
-            continue
+    # 任务都已完成时只需调用抽奖接口，不必启动浏览器
+    status = check_lottery_status(token)
+    if status.get("errno") == 0:
+        data = status.get("data", {})
+        if all(data.get(key, 0) > 0 for key in ("followTimes", "shareTimes", "readTimes")):
+            print("  抽奖任务均已完成，使用 API 模式")
+            run_lottery_api_only(token)
+            return True
 
-        user_info = extract_user_info_from_cookies(cookie_str)
-        token = user_info.get('token', '')
+    # 使用浏览器模式执行（可以点击任务按钮）
+    run_lottery_with_browser(account, token)
+    return True
 
-        if not token:
-            print("  错误: Cookie 中未找到 token")
-            all_success = False
-            continue
 
-        print(f"  用户: {user_info.get('nickname', user_info.get('username', '未知'))}")
+def main(accounts=None):
+    """主函数"""
+    print("=== 抽奖任务自动化 ===\n")
 
-        # 使用浏览器模式执行（可以点击任务按钮）
-        run_lottery_with_browser(cookie_str, token)
+    if accounts is None:
+        accounts = get_all_accounts()
+    if not accounts:
+        print("错误: 请设置 ZAIMANHUA_COOKIE 环境变量")
+        return False
 
-    return all_success
+    return run_accounts(accounts, lottery_account)
 
 
 if __name__ == "__main__":
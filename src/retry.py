@@ -0,0 +1,221 @@
+"""重试策略
+
+签到、评论、领取等流程的重试统一走这里：
+- classify_error() / classify_response() 把失败分为四类：
+  PERMANENT（PermanentError、HTTP 401/403、缺少 Chromium 等，重试无意义，立即失败）、
+  TRANSIENT（超时、连接失败、HTTP 5xx/429，间隔后重试）、
+  PAGE（页面元素找不到等，可能是页面尚未加载完，按临时错误处理）、
+  UNKNOWN（JSON 解析失败等无法归类的异常，整体流程仍会重试，但不当作服务端故障）
+- 只有 is_account_problem() 认定的账号问题（未绑定手机号、封禁）才抛出 PermanentError，
+  登录失效、HTTP 401/403 等仍交给调用方回退到浏览器流程
+- backoff_delay() 指数退避 + 抖动，避免多个账号同时重试
+- 每个主机一个熔断器：连续失败 BREAKER_THRESHOLD 次后打开，冷却期内该主机的请求直接失败
+- 整次运行共享一个重试预算（ZAIMANHUA_RETRY_BUDGET，默认 20 次），所有账号的重试合计不超过预算
+"""
+import os
+import random
+import threading
+import time
+
+import tracing
+
+PERMANENT = 'permanent'
+TRANSIENT = 'transient'
+PAGE = 'page'
+UNKNOWN = 'unknown'
+
+# 配置
+RETRY_BUDGET = int(os.environ.get('ZAIMANHUA_RETRY_BUDGET', '20'))
+BREAKER_THRESHOLD = 5   # 连续失败多少次后熔断
+BREAKER_COOLDOWN = 60   # 熔断后多少秒内拒绝请求（秒）
+
+# 异常信息中表示重试无法解决的完整短语（区分大小写，避免误伤 "Unexpected token" 之类的报错）
+PERMANENT_ERRORS = ("Executable doesn't exist",)
+# 接口错误提示中表示账号本身受限的短语，换用浏览器也无法解决
+ACCOUNT_MESSAGES = ('绑定手机', '封禁')
+
+
+class PermanentError(Exception):
+    """重试无法解决的错误（Cookie 失效、账号限制等）"""
+
+
+class CircuitOpenError(Exception):
+    """主机已熔断，请求未发出"""
+
+
+def is_account_problem(message):
+    """错误提示是否表示账号本身受限（未绑定手机号、封禁），换用浏览器也无法解决"""
+    text = str(message or '')
+    return any(keyword in text for keyword in ACCOUNT_MESSAGES)
+
+
+def classify_response(status_code):
+    """按 HTTP 状态码分类，返回 PERMANENT / TRANSIENT，成功或无法判断时返回 None"""
+    if status_code in (401, 403):
+        return PERMANENT
+    if status_code == 429 or status_code >= 500:
+        return TRANSIENT
+    return None
+
+
+def classify_error(error):
+    """异常分类，返回 PERMANENT / TRANSIENT / PAGE，无法归类时返回 UNKNOWN"""
+    if isinstance(error, PermanentError):
+        return PERMANENT
+    if isinstance(error, CircuitOpenError):
+        return TRANSIENT
+    name = type(error).__name__
+    message = str(error)
+    if any(phrase in message for phrase in PERMANENT_ERRORS):
+        return PERMANENT
+    # requests 的 Timeout / ConnectionError 和 Playwright 的 TimeoutError
+    if 'Timeout' in name or 'Connection' in name or 'Timeout' in message:
+        return TRANSIENT
+    if 'selector' in message or 'locator' in message.lower():
+        return PAGE
+    return UNKNOWN
+
+
+def backoff_delay(attempt, base=2.0, cap=60.0):
+    """第 attempt 次失败后的等待时间：base * 2^(attempt-1)，上限 cap，取其一半加随机抖动"""
+    delay = min(cap, base * 2 ** (attempt - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class RetryBudget:
+    """整次运行共享的重试次数预算（线程安全）"""
+
+    def __init__(self, total):
+        self.total = total
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def consume(self):
+        """占用一次重试，预算用完时返回 False"""
+        with self._lock:
+            if self.used >= self.total:
+                return False
+            self.used += 1
+            return True
+
+    def reset(self):
+        with self._lock:
+            self.used = 0
+
+
+class CircuitBreaker:
+    """单个主机的熔断器：连续失败达到阈值后打开，冷却期结束后放行一次试探请求"""
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.cooldown:
+                # 半开: 放行一次试探，失败则重新计时
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                if self.opened_at is None:
+                    print(f"  连续失败 {self.failures} 次，暂停请求该主机 {self.cooldown} 秒")
+                self.opened_at = time.monotonic()
+
+
+_budget = RetryBudget(RETRY_BUDGET)
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(host):
+    """获取主机对应的熔断器"""
+    with _breakers_lock:
+        if host not in _breakers:
+            _breakers[host] = CircuitBreaker()
+        return _breakers[host]
+
+
+def reset():
+    """重置重试预算和所有熔断器（常驻调度每个任务开始前调用）"""
+    _budget.reset()
+    with _breakers_lock:
+        _breakers.clear()
+
+
+def retry_call(func, name, attempts=3, base_delay=2.0, max_delay=60.0):
+    """执行 func()，失败时按错误类型决定是否退避重试，返回最后一次的结果
+
+    func 返回真值视为成功；返回假值视为临时失败；抛出异常时按 classify_error() 分类。
+    永久错误立即返回 False，其余类型（包括 UNKNOWN）退避重试，重试预算用完时不再重试。
+    """
+    result = False
+    for attempt in range(1, attempts + 1):
+        print(f"尝试第 {attempt}/{attempts} 次...")
+        try:
+            with tracing.span(f'{name}.attempt', attempt=attempt):
+                result = func()
+            if result:
+                return result
+            kind = TRANSIENT
+        except Exception as e:
+            kind = classify_error(e)
+            print(f"第 {attempt} 次尝试出错: {e}")
+            result = False
+
+        if kind == PERMANENT:
+            print("错误无法通过重试解决，停止重试")
+            return result
+        if attempt == attempts:
+            break
+        if not _budget.consume():
+            print(f"本次运行的重试次数已用完（共 {_budget.total} 次），停止重试")
+            return result
+        wait = backoff_delay(attempt, base_delay, max_delay)
+        print(f"等待 {wait:.1f} 秒后重试...")
+        tracing.sleep(wait, f'{name}.retry_wait')
+
+    print(f"已尝试 {attempts} 次，仍然失败")
+    return result
+
+
+def retry_request(send, name, attempts=3, base_delay=1.0, max_delay=10.0):
+    """发送幂等的 HTTP 请求，超时、连接失败和 5xx/429 时退避重试
+
+    send() 发出请求并返回响应；不再重试时返回最后一次的响应或抛出最后一次的异常。
+    """
+    for attempt in range(1, attempts + 1):
+        resp, error = None, None
+        try:
+            resp = send()
+            if classify_response(resp.status_code) != TRANSIENT:
+                return resp
+            reason = f'HTTP {resp.status_code}'
+        except Exception as e:
+            if isinstance(e, CircuitOpenError) or classify_error(e) != TRANSIENT:
+                raise
+            error, reason = e, str(e)
+
+        if attempt == attempts or not _budget.consume():
+            break
+        wait = backoff_delay(attempt, base_delay, max_delay)
+        print(f"  {name} 失败 ({reason})，{wait:.1f} 秒后重试")
+        tracing.sleep(wait, f'{name}.retry_wait')
+
+    if error is not None:
+        raise error
+    return resp
@@ -0,0 +1,277 @@
+"""多账号并发执行器
+
+各入口脚本把单账号流程写成 job(account) -> bool，交给 run_accounts 并发执行：
+- 并发数由 ZAIMANHUA_MAX_WORKERS 控制（默认 5，设为 1 即恢复串行）
+- 并发时每个账号的 print 输出先写入独立缓冲区，账号结束后整块输出，日志互不交错
+- 所有账号的结果合并为一个布尔值，由调用方转换为退出码
+- 工作线程结束前执行 register_thread_cleanup() 注册的回收函数（如关闭本线程的浏览器）
+- 常驻进程可调用 start_worker_pool() 让工作线程在多次运行之间保持存活，复用线程内的浏览器
+- 第一次执行时打印进程启动耗时（解释器启动 + 模块导入）以及是否已加载 Playwright
+- 每个账号的任务在 tracing.account_scope() 中执行，耗时 span 按账号归类
+- 汇总结尾输出 register_run_summary() 注册的附加信息（如浏览器启动与复用次数）
+"""
+import io
+import os
+import queue
+import sys
+import threading
+import time
+
+import tracing
+
+# 配置
+DEFAULT_MAX_WORKERS = 5
+
+_output_lock = threading.Lock()
+_thread_state = threading.local()
+_thread_cleanups = []
+_run_summaries = []
+_startup_reported = False
+
+
+def register_thread_cleanup(func):
+    """注册线程级资源回收函数，在每个工作线程退出前调用"""
+    if func not in _thread_cleanups:
+        _thread_cleanups.append(func)
+
+
+def register_run_summary(start):
+    """注册汇总信息：每次 run_accounts 开始时调用 start()，
+    其返回的函数在汇总时调用，返回要追加输出的一行文字（无内容时返回 None）"""
+    if start not in _run_summaries:
+        _run_summaries.append(start)
+
+
+def _run_thread_cleanups():
+    """执行当前线程的资源回收"""
+    for func in _thread_cleanups:
+        try:
+            func()
+        except Exception as e:
+            print(f"资源回收失败: {e}")
+
+
+class _ThreadRoutedStdout:
+    """按线程分发 stdout：注册了缓冲区的线程写入缓冲区，其他线程写入原始 stdout"""
+
+    def __init__(self, original):
+        self._original = original
+
+    def _target(self):
+        return getattr(_thread_state, 'buffer', None) or self._original
+
+    def write(self, text):
+        return self._target().write(text)
+
+    def flush(self):
+        return self._target().flush()
+
+    def __getattr__(self, name):
+        return getattr(self._original, name)
+
+
+def inherit_output(func):
+    """包装函数，使其在其他线程中执行时仍写入当前账号的日志缓冲区和追踪上下文"""
+    buffer = getattr(_thread_state, 'buffer', None)
+    trace_context = tracing.current_context()
+
+    def wrapper(*args, **kwargs):
+        previous = getattr(_thread_state, 'buffer', None)
+        previous_trace = tracing.current_context()
+        _thread_state.buffer = buffer
+        tracing.set_context(*trace_context)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _thread_state.buffer = previous
+            tracing.set_context(*previous_trace)
+
+    return wrapper
+
+
+def _process_age():
+    """进程已运行的秒数，读取 /proc 失败时退回 CPU 时间"""
+    try:
+        with open('/proc/self/stat') as f:
+            # 进程名可能含空格，从最后一个 ')' 之后开始切分，starttime 是第 22 个字段
+            fields = f.read().rsplit(')', 1)[1].split()
+        start_ticks = int(fields[19])
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return time.process_time()
+
+
+def report_startup():
+    """打印一次启动耗时（从进程启动到开始执行账号任务）"""
+    global _startup_reported
+    if _startup_reported:
+        return
+    _startup_reported = True
+    playwright_state = '已加载' if 'playwright' in sys.modules else '未加载'
+    print(f"启动耗时 {_process_age():.2f}s (Playwright {playwright_state})")
+
+
+def get_max_workers(account_count):
+    """读取并发数配置，不超过账号数量"""
+    try:
+        workers = int(os.environ.get('ZAIMANHUA_MAX_WORKERS', DEFAULT_MAX_WORKERS))
+    except ValueError:
+        workers = DEFAULT_MAX_WORKERS
+    return max(1, min(workers, account_count))
+
+
+def _run_job(job, account):
+    """执行单个账号任务，异常视为失败"""
+    start = time.perf_counter()
+    try:
+        with tracing.account_scope(account.label):
+            success = bool(job(account))
+    except Exception as e:
+        print(f"[ERROR] {account.label} 执行异常: {e}")
+        success = False
+    return success, time.perf_counter() - start
+
+
+def _run_buffered(job, index, account, results, original_stdout):
+    """执行单个账号任务，并把该账号的完整日志一次性输出"""
+    _thread_state.buffer = io.StringIO()
+    try:
+        results[index] = _run_job(job, account)
+    finally:
+        log = _thread_state.buffer.getvalue()
+        _thread_state.buffer = None
+        with _output_lock:
+            original_stdout.write(log)
+            original_stdout.flush()
+
+
+def _worker(job, jobs, results, original_stdout):
+    """工作线程：依次取出账号执行，队列取空后回收本线程资源"""
+    while True:
+        try:
+            index, account = jobs.get_nowait()
+        except queue.Empty:
+            _run_thread_cleanups()
+            return
+        _run_buffered(job, index, account, results, original_stdout)
+
+
+class _WorkerPool:
+    """常驻工作线程池：线程在多次 run_accounts 之间保持存活，线程内的浏览器等资源可以复用"""
+
+    def __init__(self, size):
+        self.size = size
+        self.tasks = queue.Queue()
+        self.threads = [threading.Thread(target=self._loop, daemon=True) for _ in range(size)]
+        for t in self.threads:
+            t.start()
+
+    def _loop(self):
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                _run_thread_cleanups()
+                return
+            task()
+
+    def run(self, job, accounts, results, original_stdout):
+        """提交所有账号并等待完成"""
+        done = queue.Queue()
+        for index, account in enumerate(accounts):
+            def task(index=index, account=account):
+                try:
+                    _run_buffered(job, index, account, results, original_stdout)
+                finally:
+                    done.put(index)
+            self.tasks.put(task)
+        for _ in accounts:
+            done.get()
+
+    def shutdown(self):
+        for _ in self.threads:
+            self.tasks.put(None)
+        for t in self.threads:
+            t.join()
+
+
+_pool = None
+
+
+def start_worker_pool(size):
+    """启动常驻工作线程池（供常驻调度进程使用），之后的 run_accounts 都在池中执行"""
+    global _pool
+    if _pool is None:
+        _pool = _WorkerPool(max(1, size))
+    return _pool
+
+
+def shutdown_worker_pool():
+    """停止常驻工作线程池并回收各线程资源"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
+
+
+def run_accounts(accounts, job, max_workers=None):
+    """并发执行所有账号的任务
+
+    Args:
+        accounts: [Account, ...]
+        job: 单账号任务函数 job(account) -> bool
+        max_workers: 并发数，默认读取 ZAIMANHUA_MAX_WORKERS；已启动常驻线程池时以线程池大小为准
+
+    Returns:
+        所有账号均成功时返回 True
+    """
+    if not accounts:
+        return True
+
+    report_startup()
+    summary_reports = [start() for start in _run_summaries]
+    workers = _pool.size if _pool else (max_workers or get_max_workers(len(accounts)))
+    results = [None] * len(accounts)
+    start = time.perf_counter()
+
+    if workers == 1 and _pool is None:
+        # 串行模式直接输出，保持实时日志
+        try:
+            for index, account in enumerate(accounts):
+                results[index] = _run_job(job, account)
+        finally:
+            _run_thread_cleanups()
+    else:
+        print(f"并发执行 {len(accounts)} 个账号 (并发数: {min(workers, len(accounts))})")
+        original_stdout = sys.stdout
+        sys.stdout = _ThreadRoutedStdout(original_stdout)
+        try:
+            if _pool is not None:
+                _pool.run(job, accounts, results, original_stdout)
+            else:
+                jobs = queue.Queue()
+                for index, account in enumerate(accounts):
+                    jobs.put((index, account))
+                threads = [
+                    threading.Thread(target=_worker, args=(job, jobs, results, original_stdout), daemon=True)
+                    for _ in range(workers)
+                ]
+                for t in threads:
+                    t.start()
+                for t in threads:
+                    t.join()
+        finally:
+            sys.stdout = original_stdout
+
+    print(f"\n--- 账号执行汇总 (总耗时 {time.perf_counter() - start:.1f}s) ---")
+    all_success = True
+    for account, (success, elapsed) in zip(accounts, results):
+        print(f"  [{'OK' if success else 'FAIL'}] {account.label} ({elapsed:.1f}s)")
+        all_success = all_success and success
+    for report in summary_reports:
+        line = report()
+        if line:
+            print(f"  {line}")
+
+    return all_success
@@ -0,0 +1,174 @@
+"""常驻调度进程
+
+在一个进程内按 cron 表达式定时执行签到、评论、阅读、抽奖和活动任务，替代每个 workflow 各自冷启动：
+- 账号只在启动时加载一次
+- HTTP 连接池和各工作线程的浏览器在任务之间保持复用
+- 时间按北京时间 (UTC+8) 计算
+
+用法:
+    python src/scheduler.py                      # 按默认时间表常驻运行
+    python src/scheduler.py --jobs checkin,read  # 只调度部分任务
+    python src/scheduler.py --run-now checkin    # 立即执行一次指定任务后继续常驻
+    python src/scheduler.py --list               # 打印时间表和下次执行时间
+
+时间表可通过环境变量覆盖，如 ZAIMANHUA_SCHEDULE_CHECKIN="0 8 * * *"。
+"""
+import argparse
+import importlib
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+import retry
+import tracing
+from runner import get_max_workers, report_startup, shutdown_worker_pool, start_worker_pool
+from utils import get_all_accounts
+
+# 北京时间，无夏令时
+BEIJING_TZ = timezone(timedelta(hours=8))
+
+# 任务名 -> (模块名, 入口函数, 默认 cron 表达式, 是否默认启用)
+JOBS = {
+    'checkin': ('checkin', 'main', '0 8 * * *', True),
+    'comment': ('comment', 'main', '30 9 * * *', True),
+    'read': ('auto_read', 'run_auto_read', '0 10 * * *', True),
+    'lottery': ('lottery', 'main', '0 11 * * *', True),
+    # 限时活动默认关闭，活动期间通过 --jobs 启用
+    'draw_4th': ('draw_4th', 'main', '0,20,40 5-23 * * *', False),
+    'new_year': ('2026new_year', 'main', '*/15 8-23 * * *', False),
+}
+
+
+def _parse_field(field, low, high):
+    """解析 cron 的单个字段，支持 *、*/n、a-b、a-b/n 和逗号分隔"""
+    values = set()
+    for part in field.split(','):
+        step = 1
+        if '/' in part:
+            part, step_str = part.split('/', 1)
+            step = int(step_str)
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start, end = (int(x) for x in part.split('-', 1))
+        else:
+            start = end = int(part)
+        if start < low or end > high or start > end or step < 1:
+            raise ValueError(f"cron 字段超出范围: {field}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """5 段 cron 表达式: 分 时 日 月 周（周日为 0）"""
+
+    def __init__(self, expr):
+        fields = expr.split()
+        if len(fields) != 5:
+            raise ValueError(f"cron 表达式必须是 5 段: {expr}")
+        self.expr = expr
+        self.minutes = _parse_field(fields[0], 0, 59)
+        self.hours = _parse_field(fields[1], 0, 23)
+        self.days = _parse_field(fields[2], 1, 31)
+        self.months = _parse_field(fields[3], 1, 12)
+        self.weekdays = _parse_field(fields[4], 0, 6)
+
+    def matches(self, dt):
+        return (dt.minute in self.minutes and dt.hour in self.hours and dt.day in self.days
+                and dt.month in self.months and (dt.weekday() + 1) % 7 in self.weekdays)
+
+    def next_after(self, dt):
+        """返回 dt 之后第一个匹配的整分钟时间"""
+        candidate = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        for _ in range(366 * 24 * 60):
+            if self.matches(candidate):
+                return candidate
+            candidate += timedelta(minutes=1)
+        raise ValueError(f"cron 表达式一年内不会触发: {self.expr}")
+
+
+def load_schedule(job_names):
+    """生成 {任务名: CronSchedule}，环境变量 ZAIMANHUA_SCHEDULE_<任务名> 可覆盖默认时间"""
+    schedule = {}
+    for name in job_names:
+        if name not in JOBS:
+            raise ValueError(f"未知任务: {name}（可选: {', '.join(JOBS)}）")
+        expr = os.environ.get(f'ZAIMANHUA_SCHEDULE_{name.upper()}', JOBS[name][2])
+        schedule[name] = CronSchedule(expr)
+    return schedule
+
+
+def run_job(name, accounts):
+    """在当前进程内执行一个任务，异常不影响调度进程"""
+    module_name, func_name, _, _ = JOBS[name]
+    print(f"\n{'#'*60}")
+    print(f"[调度] 开始任务 {name} ({datetime.now(BEIJING_TZ):%Y-%m-%d %H:%M:%S})")
+    print('#'*60)
+    start = time.perf_counter()
+    # 每个任务视为一次独立运行：重试预算和熔断状态重新计算
+    retry.reset()
+    try:
+        module = importlib.import_module(module_name)
+        success = getattr(module, func_name)(accounts=accounts)
+    except Exception as e:
+        print(f"[调度] 任务 {name} 异常: {e}")
+        success = False
+    # 常驻进程不会退出，每个任务结束后单独输出耗时报告
+    tracing.write_report(name)
+    print(f"[调度] 任务 {name} 结束: {'成功' if success is not False else '失败'} ({time.perf_counter() - start:.1f}s)")
+    return success
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Zaimanhua 常驻调度进程')
+    default_jobs = ','.join(name for name, job in JOBS.items() if job[3])
+    parser.add_argument('--jobs', default=os.environ.get('ZAIMANHUA_SCHEDULE_JOBS', default_jobs),
+                        help=f'要调度的任务，逗号分隔（默认: {default_jobs}）')
+    parser.add_argument('--run-now', default='', help='启动后立即执行的任务，逗号分隔')
+    parser.add_argument('--list', action='store_true', help='只打印时间表')
+    args = parser.parse_args()
+
+    job_names = [name.strip() for name in args.jobs.split(',') if name.strip()]
+    schedule = load_schedule(job_names)
+
+    now = datetime.now(BEIJING_TZ)
+    print("=== 调度时间表 (北京时间) ===")
+    for name, cron in schedule.items():
+        print(f"  {name:<10} {cron.expr:<22} 下次: {cron.next_after(now):%m-%d %H:%M}")
+    if args.list:
+        return True
+
+    accounts = get_all_accounts()
+    if not accounts:
+        print("Error: 未配置任何账号 Cookie")
+        return False
+    print(f"共加载 {len(accounts)} 个账号")
+    report_startup()
+
+    start_worker_pool(get_max_workers(len(accounts)))
+    try:
+        for name in (n.strip() for n in args.run_now.split(',') if n.strip()):
+            load_schedule([name])
+            run_job(name, accounts)
+
+        next_runs = {name: cron.next_after(datetime.now(BEIJING_TZ)) for name, cron in schedule.items()}
+        while True:
+            due_at = min(next_runs.values())
+            wait = (due_at - datetime.now(BEIJING_TZ)).total_seconds()
+            if wait > 0:
+                time.sleep(min(wait, 60))
+                continue
+
+            for name in [n for n, t in next_runs.items() if t <= due_at]:
+                run_job(name, accounts)
+                next_runs[name] = schedule[name].next_after(max(due_at, datetime.now(BEIJING_TZ) - timedelta(minutes=1)))
+    except KeyboardInterrupt:
+        print("\n[调度] 收到中断信号，退出")
+    finally:
+        shutdown_worker_pool()
+    return True
+
+
+if __name__ == '__main__':
+    success = main()
+    exit(0 if success else 1)
@@ -0,0 +1,218 @@
+"""轻量级耗时追踪
+
+记录每个账号各步骤（HTTP 请求、页面导航、等待、重试等）的嵌套耗时区间 (span)，
+进程结束时输出 JSON 运行报告和按自身耗时排序的 Top-N 汇总，用来判断下一步该优化哪里。
+
+用法:
+    with span('claim.probe', task_id=13):
+        ...
+
+    @traced('checkin.page')
+    def checkin_once(...):
+        ...
+
+环境变量:
+    ZAIMANHUA_TRACE=0          关闭追踪
+    ZAIMANHUA_TRACE_REPORT     JSON 报告路径（默认 reports/trace-<脚本名>.json）
+    ZAIMANHUA_TRACE_TOP        汇总显示的条目数（默认 10）
+"""
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+REPORT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'reports')
+DEFAULT_TOP_N = 10
+
+_local = threading.local()
+_lock = threading.Lock()
+_spans = []
+_next_id = 0
+_run_start = time.time()
+
+
+def _enabled():
+    return os.environ.get('ZAIMANHUA_TRACE', '1').lower() not in ('0', 'false', 'no', 'off')
+
+
+def _stack():
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def current_context():
+    """返回当前线程的 (账号, 父 span id)，供子线程继承"""
+    stack = _stack()
+    return getattr(_local, 'account', None), (stack[-1]['id'] if stack else getattr(_local, 'parent', None))
+
+
+def set_context(account, parent=None):
+    """设置当前线程所属账号和父 span（子线程继承调用方上下文时使用）"""
+    _local.account = account
+    _local.parent = parent
+
+
+@contextmanager
+def span(name, **attrs):
+    """记录一个耗时区间，可嵌套；异常会记录到 span 后继续抛出"""
+    if not _enabled():
+        yield attrs
+        return
+
+    global _next_id
+    account, parent = current_context()
+    with _lock:
+        _next_id += 1
+        span_id = _next_id
+    record = {
+        'id': span_id,
+        'parent': parent,
+        'account': account,
+        'name': name,
+        'start': round(time.time() - _run_start, 4),
+        'attrs': attrs,
+    }
+    stack = _stack()
+    stack.append(record)
+    start = time.perf_counter()
+    try:
+        yield attrs
+    except BaseException as e:
+        record['error'] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        record['duration'] = round(time.perf_counter() - start, 4)
+        stack.pop()
+        with _lock:
+            _spans.append(record)
+
+
+@contextmanager
+def account_scope(account):
+    """把当前线程内记录的 span 归到指定账号下，并记录账号总耗时"""
+    previous_account = getattr(_local, 'account', None)
+    previous_parent = getattr(_local, 'parent', None)
+    set_context(account)
+    try:
+        with span('account'):
+            yield
+    finally:
+        set_context(previous_account, previous_parent)
+
+
+def traced(name=None):
+    """装饰器版本的 span，默认以函数名命名"""
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def sleep(seconds, name='wait.sleep'):
+    """带 span 的 time.sleep"""
+    with span(name, seconds=seconds):
+        time.sleep(seconds)
+
+
+def trace_page(page):
+    """给 Playwright 页面的导航和等待方法加上 span"""
+    for method in ('goto', 'reload', 'wait_for_timeout', 'wait_for_load_state', 'wait_for_selector'):
+        original = getattr(page, method, None)
+        if original is None:
+            continue
+
+        def wrapper(*args, _original=original, _method=method, **kwargs):
+            attrs = {}
+            if _method == 'goto' and args:
+                attrs['url'] = str(args[0]).split('?', 1)[0]
+            elif _method == 'wait_for_timeout' and args:
+                attrs['ms'] = args[0]
+            with span(f'page.{_method}', **attrs):
+                return _original(*args, **kwargs)
+        setattr(page, method, wrapper)
+    return page
+
+
+def _summarize(spans):
+    """按 span 名称汇总次数、总耗时和自身耗时（扣除子 span）"""
+    child_time = {}
+    for s in spans:
+        if s['parent'] is not None:
+            child_time[s['parent']] = child_time.get(s['parent'], 0) + s['duration']
+
+    summary = {}
+    for s in spans:
+        item = summary.setdefault(s['name'], {'name': s['name'], 'count': 0, 'total': 0.0, 'self': 0.0, 'max': 0.0, 'errors': 0})
+        item['count'] += 1
+        item['total'] += s['duration']
+        item['self'] += max(0.0, s['duration'] - child_time.get(s['id'], 0))
+        item['max'] = max(item['max'], s['duration'])
+        if 'error' in s:
+            item['errors'] += 1
+    for item in summary.values():
+        for key in ('total', 'self', 'max'):
+            item[key] = round(item[key], 4)
+    return sorted(summary.values(), key=lambda x: x['self'], reverse=True)
+
+
+def write_report(name=None):
+    """写出 JSON 运行报告并打印 Top-N 汇总，然后清空已记录的 span
+
+    Args:
+        name: 报告名，默认取入口脚本文件名
+    """
+    global _run_start
+    with _lock:
+        spans = list(_spans)
+        _spans.clear()
+    run_start = _run_start
+    _run_start = time.time()
+    if not spans or not _enabled():
+        return None
+
+    name = name or os.path.splitext(os.path.basename(sys.argv[0] or 'run'))[0] or 'run'
+    summary = _summarize(spans)
+    report = {
+        'name': name,
+        'started_at': datetime.fromtimestamp(run_start).isoformat(timespec='seconds'),
+        'wall_time': round(max(s['start'] + s['duration'] for s in spans), 4),
+        'summary': summary,
+        'spans': sorted(spans, key=lambda s: s['start']),
+    }
+
+    path = os.environ.get('ZAIMANHUA_TRACE_REPORT') or os.path.join(REPORT_DIR, f'trace-{name}.json')
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+    except OSError as e:
+        print(f"写入追踪报告失败: {e}")
+        path = None
+
+    try:
+        top_n = int(os.environ.get('ZAIMANHUA_TRACE_TOP', DEFAULT_TOP_N))
+    except ValueError:
+        top_n = DEFAULT_TOP_N
+    print(f"\n--- 耗时 Top {top_n} (按自身耗时排序) ---")
+    print(f"  {'步骤':<28} {'次数':>3} {'自身(s)':>7} {'总计(s)':>7} {'最长(s)':>7}")
+    for item in summary[:top_n]:
+        errors = f"  失败 {item['errors']}" if item['errors'] else ''
+        print(f"  {item['name']:<30} {item['count']:>5} {item['self']:>9.2f} {item['total']:>9.2f} {item['max']:>9.2f}{errors}")
+    if path:
+        print(f"完整报告: {path}")
+    return report
+
+
+atexit.register(write_report)
@@ -1,70 +1,49 @@
 """共享工具函数"""
 import os
+import hashlib
 import json
-import requests
-from urllib.parse import unquote
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
+import retry
+from account import Account
+from browser import new_context
+from cache_store import STATE_DIR, EndpointCache, atomic_write_json, read_json
+from endpoints import I_BASE, WWW_BASE
+from http_client import http_get, http_post
+from runner import inherit_output
+from tracing import span
+
 
 # 配置
 PAGE_TIMEOUT = 60000
+TASK_CACHE_TTL = 300  # 任务列表快照最长有效期（秒），防止常驻进程使用过期数据
 
+CLAIM_ENDPOINTS = [
+    f'{I_BASE}/lpi/v1/task/receive',
+    f'{I_BASE}/lpi/v1/task/claim',
+    f'{I_BASE}/lpi/v1/task/get_reward',
+]
+CLAIM_PARAM_NAMES = ['id', 'taskId', 'task_id']
+# 领取接口返回这些提示时说明接口或参数不对，其余失败提示（任务未完成等）说明接口识别了请求
+CLAIM_COMBO_ERRORS = ('参数', 'param', 'not found', '不存在', 'method')
+CLAIM_REFUSED = 'refused'  # _try_claim 失败类型: 接口有效但拒绝领取
+CLAIM_MAX_WORKERS = 4  # 批量领取并发数
+STORAGE_STATE_TTL = 7 * 24 * 3600  # 浏览器登录状态有效期（秒）
 
-def extract_user_info_from_cookies(cookie_str):
-    """从 Cookie 中提取用户信息用于设置 localStorage"""
-    user_info = {}
+# 领取接口探测结果（跨运行持久化）
+_claim_endpoint = EndpointCache('claim_endpoint.json', 'claim_task_reward')
 
-    # 解析 lginfo cookie - 它是 URL 编码的 JSON
-    for item in cookie_str.split(';'):
-        item = item.strip()
-        if item.startswith('lginfo='):
-            lginfo_value = item[7:]  # Remove 'lginfo='
-            lginfo_decoded = unquote(lginfo_value)
-            # 尝试解析为 JSON
-            try:
-                parsed = json.loads(lginfo_decoded)
-                # 确保解析结果是字典类型（防止 JSON 字符串字面量导致 .get() 失败）
-                if isinstance(parsed, dict):
-                    user_info = parsed
-            except json.JSONDecodeError:
-                # 如果不是 JSON，尝试解析 key=value&key=value 格式
-                for pair in lginfo_decoded.split('&'):
-                    if '=' in pair:
-                        k, v = pair.split('=', 1)
-                        user_info[k] = v
-            break
+# 任务列表快照缓存: token -> (获取时间, 响应)
+_task_cache = {}
+_task_cache_lock = threading.Lock()
 
-    # 如果没有从 lginfo 获取到，尝试从 addinfo 获取
-    if not user_info.get('uid'):
-        for item in cookie_str.split(';'):
-            item = item.strip()
-            if item.startswith('addinfo='):
-                # addinfo 格式: uid|username|phone|token
-                parts = item[8:].split('|')
-                if len(parts) >= 4:
-                    user_info = {
-                        'uid': int(parts[0]),
-                        'username': parts[1],
-                        'nickname': parts[1],
-                        'bind_phone': parts[2],
-                        'token': parts[3]
-                    }
-                break
-
-    # 确保有 token
-    if not user_info.get('token'):
-        for item in cookie_str.split(';'):
-            item = item.strip()
-            if item.startswith('token='):
-                user_info['token'] = item[6:]
-                break
-
-    return user_info
-
-
-def init_localstorage(page, cookie_str):
+
+def init_localstorage(page, account):
     """在当前页面设置 localStorage 以确保 Vue 应用识别登录状态"""
-    user_info = extract_user_info_from_cookies(cookie_str)
+    user_info = account.user_info
 
     if not user_info.get('uid'):
         print("警告: 无法从 Cookie 中提取用户信息")
@@ -101,23 +80,78 @@ def init_localstorage(page, cookie_str):
     return True
 
 
-def _make_account_label(default_label, cookie_str):
-    """从 Cookie 中提取用户名，生成带用户名的账号标签"""
+def get_login_uid(page):
+    """读取页面 localStorage 中 lginfo 的 uid，未登录时返回 None"""
     try:
-        user_info = extract_user_info_from_cookies(cookie_str)
-        if isinstance(user_info, dict):
-            name = user_info.get('nickname') or user_info.get('username')
-            if name:
-                return f"{default_label} ({name})"
+        lginfo = page.evaluate('localStorage.getItem("lginfo")')
+        return json.loads(lginfo).get('uid') if lginfo else None
     except Exception:
+        return None
+
+
+def _storage_state_path(account):
+    return os.path.join(STATE_DIR, f'storage_state-{account.key}.json')
+
+
+def _cookie_fingerprint(account):
+    """Cookie 和站点地址的摘要，任一变化时已保存的登录状态作废"""
+    return hashlib.sha256(f'{WWW_BASE}\n{account.cookie_str}'.encode()).hexdigest()
+
+
+def load_storage_state(account):
+    """读取账号已保存的 storage_state（Cookie + localStorage），Cookie 变化或过期时返回 None"""
+    saved = read_json(_storage_state_path(account))
+    if not isinstance(saved, dict) or saved.get('fingerprint') != _cookie_fingerprint(account):
+        return None
+    if time.time() - saved.get('ts', 0) > STORAGE_STATE_TTL:
+        return None
+    return saved.get('state')
+
+
+def save_storage_state(context, account):
+    """登录状态初始化成功后保存上下文的 storage_state，之后的上下文直接载入"""
+    try:
+        atomic_write_json(_storage_state_path(account), {
+            'fingerprint': _cookie_fingerprint(account),
+            'ts': time.time(),
+            'state': context.storage_state(),
+        })
+    except Exception as e:
+        print(f"保存登录状态失败: {e}")
+
+
+def invalidate_storage_state(account):
+    """登录检查失败或 Cookie 失效时删除已保存的登录状态"""
+    try:
+        os.remove(_storage_state_path(account))
+        print("已清除保存的登录状态")
+    except FileNotFoundError:
         pass
-    return default_label
+    except OSError as e:
+        print(f"清除登录状态失败: {e}")
+
+
+def ensure_login(page, account):
+    """确认当前页面的 Vue 应用能识别登录（localStorage 中有本账号的 lginfo）
+
+    上下文载入了已保存的登录状态时直接通过；否则写入 localStorage 并保存登录状态，
+    之后同源的页面导航无需再刷新。
+    """
+    uid = account.user_info.get('uid')
+    if uid and str(get_login_uid(page)) == str(uid):
+        return True
+    if getattr(page.context, 'restored_state', False):
+        print("保存的登录状态无效，重新初始化")
+        invalidate_storage_state(account)
+    if not init_localstorage(page, account):
+        return False
+    save_storage_state(page.context, account)
+    return True
 
 
-def validate_cookie(cookie_str):
-    """验证 Cookie 是否有效，返回 (is_valid, error_msg)"""
-    user_info = extract_user_info_from_cookies(cookie_str)
-    token = user_info.get('token') if isinstance(user_info, dict) else None
+def validate_cookie(account):
+    """验证账号 Cookie 是否有效，返回 (is_valid, error_msg)"""
+    token = account.token
 
     if not token:
         return False, "Cookie 中未找到 token"
@@ -132,56 +166,50 @@ def validate_cookie(cookie_str):
     return True, None
 
 
-def get_all_cookies():
-    """获取所有账号的 Cookie"""
+def get_all_accounts():
+    """读取所有账号的 Cookie，返回 Account 列表"""
     load_dotenv()  # 自动加载 .env 文件（本地测试用）
 
-    cookies_list = []
+    accounts = []
     single = os.environ.get('ZAIMANHUA_COOKIE')
     if single:
-        label = _make_account_label('默认账号', single)
-        cookies_list.append((label, single))
+        accounts.append(Account(single, '默认账号'))
     i = 1
     while True:
         cookie = os.environ.get(f'ZAIMANHUA_COOKIE_{i}')
         if cookie:
-            label = _make_account_label(f'账号 {i}', cookie)
-            cookies_list.append((label, cookie))
+            accounts.append(Account(cookie, f'账号 {i}'))
             i += 1
         else:
             break
-    return cookies_list
-
-
-def parse_cookies(cookie_str):
-    """解析 Cookie 字符串为 Playwright 格式"""
-    cookies = []
-    for item in cookie_str.split(';'):
-        item = item.strip()
-        if '=' in item:
-            name, value = item.split('=', 1)
-            cookies.append({
-                'name': name.strip(),
-                'value': value.strip(),
-                'domain': '.zaimanhua.com',
-                'path': '/'
-            })
-    return cookies
-
-
-def get_task_list(token):
-    """通过 API 获取任务列表"""
+    return accounts
+
+
+def get_task_list(token, fresh=False):
+    """通过 API 获取任务列表
+
+    成功的响应按 token 缓存为快照，只读调用方直接复用；
+    任务状态可能已变化时（签到、领取、评论、阅读之后）传入 fresh=True 或先调用 invalidate_task_cache()
+    """
+    if not fresh:
+        with _task_cache_lock:
+            cached = _task_cache.get(token)
+        if cached and time.monotonic() - cached[0] < TASK_CACHE_TTL:
+            return cached[1]
+
     headers = {
         'Authorization': f'Bearer {token}',
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Referer': 'https://i.zaimanhua.com/',
-        'Accept': 'application/json, text/plain, */*',
+        'Referer': f'{I_BASE}/',
     }
 
     try:
-        resp = requests.get('https://i.zaimanhua.com/lpi/v1/task/list', headers=headers, timeout=10)
+        resp = retry.retry_request(lambda: http_get(f'{I_BASE}/lpi/v1/task/list', headers=headers), 'task_list')
         if resp.status_code == 200:
-            return resp.json()
+            result = resp.json()
+            if isinstance(result, dict) and result.get('errno') == 0:
+                with _task_cache_lock:
+                    _task_cache[token] = (time.monotonic(), result)
+            return result
         else:
             print(f"  获取任务列表失败: HTTP {resp.status_code}")
             return None
@@ -190,6 +218,12 @@ def get_task_list(token):
         return None
 
 
+def invalidate_task_cache(token):
+    """任务状态发生变化后丢弃该 token 的任务列表快照"""
+    with _task_cache_lock:
+        _task_cache.pop(token, None)
+
+
 def extract_tasks_from_response(task_result):
     """从任务 API 响应中提取所有任务列表
 
@@ -238,19 +272,10 @@ def extract_tasks_from_response(task_result):
     return []
 
 
-def print_task_status(cookie_str, label=""):
+def print_task_status(account):
     """打印当前任务状态（用于调试）"""
-    token = None
-    user_info = extract_user_info_from_cookies(cookie_str)
-    # 确保 user_info 是字典类型
-    if isinstance(user_info, dict):
-        token = user_info.get('token')
-    if not token:
-        for item in cookie_str.split(';'):
-            item = item.strip()
-            if item.startswith('token='):
-                token = item[6:]
-                break
+    token = account.token
+    label = account.label
 
     if not token:
         print(f"  [{label}] 无法获取 token，跳过任务状态检查")
@@ -293,75 +318,141 @@ def print_task_status(cookie_str, label=""):
         print("  无法获取任务列表")
 
 
+def _claim_candidates():
+    """领取接口的所有 (method, url, 参数名) 组合，按原有探测顺序排列"""
+    candidates = []
+    # 组合 1: POST 请求 + JSON body（最常见的 RESTful 风格）
+    for url in CLAIM_ENDPOINTS:
+        for param_name in CLAIM_PARAM_NAMES:
+            candidates.append(('POST', url, param_name))
+    # 组合 2: GET 请求 + query string（旧版兼容）
+    for param_name in CLAIM_PARAM_NAMES:
+        for url in CLAIM_ENDPOINTS:
+            candidates.append(('GET', url, param_name))
+    return candidates
+
+
+def _claim_request(method, url, param_name, headers, task_id):
+    """按请求方式把任务 ID 放在 JSON 请求体或查询参数中"""
+    if method == 'POST':
+        return http_post(url, headers=headers, json={param_name: task_id})
+    return http_get(url, headers=headers, params={param_name: task_id})
+
+
+def _try_claim(headers, combo, task_id):
+    """用指定组合请求一次领取接口，返回 (是否成功, 响应, 失败类型)
+
+    失败类型为 None 表示该组合不对（404、参数错误、返回非 JSON 等），可以继续探测其他组合；
+    CLAIM_REFUSED 表示接口识别了请求但拒绝领取（任务未完成等），组合本身有效；
+    retry.TRANSIENT（超时、连接失败、HTTP 5xx/429）/ retry.PERMANENT（HTTP 401/403）
+    表示服务端异常或未授权，换组合也无济于事。
+    """
+    method, url, param_name = combo
+    try:
+        with span('claim.probe', method=method, url=url, param=param_name):
+            resp = _claim_request(method, url, param_name, headers, task_id)
+        if resp.status_code != 200:
+            return False, {'errmsg': f'HTTP {resp.status_code}'}, retry.classify_response(resp.status_code)
+        result = resp.json()
+        if result.get('errno') == 0 or result.get('code') == 0:
+            return True, result, None
+        errmsg = result.get('errmsg', '') or result.get('message', '')
+        if '已领取' in errmsg or '已完成' in errmsg:
+            return True, result, None
+        if result.get('errno') in (404, 405) or any(k in errmsg.lower() for k in CLAIM_COMBO_ERRORS):
+            return False, result, None
+        return False, result, CLAIM_REFUSED
+    except Exception as e:
+        # 只有网络超时、连接失败和熔断才停止探测；JSON 解析失败等视为组合不对
+        kind = retry.TRANSIENT if retry.classify_error(e) == retry.TRANSIENT else None
+        return False, {'errmsg': str(e)}, kind
+
+
 def claim_task_reward(token, task_id):
-    """通过 API 领取单个任务奖励"""
+    """通过 API 领取单个任务奖励，领取成功后任务列表快照失效
+
+    接口路径、参数名和请求方式都不固定，第一次成功的组合会记录到本地缓存（有效期
+    ENDPOINT_COMBO_TTL），之后优先使用，正常情况下一次请求即可完成领取；
+    缓存的组合失败时才重新探测全部组合；遇到网络异常、HTTP 5xx/429 或 401/403 时立即停止，
+    不再盲目尝试其余组合。
+    """
+    with span('claim.task', task_id=task_id):
+        return _claim_task_reward(token, task_id)
+
+
+def _claim_task_reward(token, task_id):
     headers = {
         'Authorization': f'Bearer {token}',
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Referer': 'https://i.zaimanhua.com/',
-        'Accept': 'application/json, text/plain, */*',
+        'Referer': f'{I_BASE}/',
         'Content-Type': 'application/json',
     }
 
-    last_result = None
+    candidates = _claim_candidates()
+    cached_combo = _claim_endpoint.cached(candidates)
+
+    if cached_combo:
+        success, result, kind = _try_claim(headers, cached_combo, task_id)
+        if success:
+            invalidate_task_cache(token)
+            return True, result
+        if kind is not None:
+            # 服务端异常或任务不可领取，缓存的组合仍然有效，不必重新探测
+            return False, result
+        print(f"  缓存的领取接口失败，重新探测: {cached_combo[0]} {cached_combo[1]} ({cached_combo[2]})")
+        _claim_endpoint.forget()
+        candidates.remove(cached_combo)
+
+    last_result = refusal = None
+    for combo in candidates:
+        success, result, kind = _try_claim(headers, combo, task_id)
+        if success:
+            _claim_endpoint.remember(combo)
+            invalidate_task_cache(token)
+            return True, result
+        last_result = result
+        if kind == CLAIM_REFUSED:
+            # 保留接口给出的拒绝原因，避免被后续组合的"参数错误"覆盖
+            refusal = refusal or result
+        elif kind is not None:
+            print(f"  领取失败且无法通过更换接口解决，停止探测: {result.get('errmsg')}")
+            break
 
-    # 尝试多种 API 端点和参数组合
-    # 组合 1: POST 请求 + JSON body（最常见的 RESTful 风格）
-    json_body_endpoints = [
-        'https://i.zaimanhua.com/lpi/v1/task/receive',
-        'https://i.zaimanhua.com/lpi/v1/task/claim',
-        'https://i.zaimanhua.com/lpi/v1/task/get_reward',
-    ]
+    return False, refusal or last_result
 
-    # 尝试不同的参数名: id, taskId, task_id
-    param_names = ['id', 'taskId', 'task_id']
 
-    for url in json_body_endpoints:
-        for param_name in param_names:
-            try:
-                json_body = {param_name: task_id}
-                resp = requests.post(url, headers=headers, json=json_body, timeout=10)
-                if resp.status_code == 200:
-                    result = resp.json()
-                    if result.get('errno') == 0 or result.get('code') == 0:
-                        return True, result
-                    errmsg = result.get('errmsg', '') or result.get('message', '')
-                    if '已领取' in errmsg or '已完成' in errmsg:
-                        return True, result
-                    last_result = result
-            except Exception as e:
-                last_result = {'errmsg': str(e)}
-                continue
+def claim_tasks_bulk(token, task_ids, max_workers=CLAIM_MAX_WORKERS):
+    """并发领取多个任务奖励，返回 {task_id: 是否领取成功}
 
-    # 组合 2: GET 请求 + query string（旧版兼容）
-    for param_name in param_names:
-        query_urls = [
-            f'https://i.zaimanhua.com/lpi/v1/task/receive?{param_name}={task_id}',
-            f'https://i.zaimanhua.com/lpi/v1/task/claim?{param_name}={task_id}',
-            f'https://i.zaimanhua.com/lpi/v1/task/get_reward?{param_name}={task_id}',
-        ]
-        for url in query_urls:
-            try:
-                resp = requests.get(url, headers=headers, timeout=10)
-                if resp.status_code == 200:
-                    result = resp.json()
-                    if result.get('errno') == 0 or result.get('code') == 0:
-                        return True, result
-                    errmsg = result.get('errmsg', '') or result.get('message', '')
-                    if '已领取' in errmsg or '已完成' in errmsg:
-                        return True, result
-                    last_result = result
-            except Exception as e:
-                last_result = {'errmsg': str(e)}
-                continue
-
-    return False, last_result
-
-
-def claim_rewards(page, cookie_str=None):
+    所有领取请求并发发出（并发数上限 max_workers），结束后只刷新一次任务列表，
+    以任务状态是否变为 3（已领取）作为最终结果；刷新失败时退回各请求自身的结果。
+    """
+    task_ids = list(dict.fromkeys(t for t in task_ids if t))
+    if not task_ids:
+        return {}
+
+    claim = inherit_output(claim_task_reward)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(task_ids)))) as pool:
+        futures = {task_id: pool.submit(claim, token, task_id) for task_id in task_ids}
+        results = {task_id: future.result()[0] for task_id, future in futures.items()}
+
+    task_result = get_task_list(token, fresh=True)
+    if task_result and task_result.get('errno') == 0:
+        statuses = {
+            (t.get('id') or t.get('taskId')): t.get('status')
+            for t in extract_tasks_from_response(task_result)
+        }
+        for task_id in task_ids:
+            if task_id in statuses:
+                results[task_id] = statuses[task_id] == 3
+
+    return results
+
+
+def claim_rewards(page=None, account=None):
     """在用户中心领取已完成任务的积分
 
-    优先使用 API 方式领取，如果失败则回退到 UI 方式
+    优先使用 API 方式领取，如果失败则回退到 UI 方式；
+    page 为 None 时只在需要回退 UI 时才创建浏览器上下文
 
     任务状态值:
     - status=1: 未完成
@@ -370,19 +461,7 @@ def claim_rewards(page, cookie_str=None):
     """
     print("\n=== 领取积分任务 ===")
 
-    # 尝试从 cookie_str 获取 token
-    token = None
-    if cookie_str:
-        user_info = extract_user_info_from_cookies(cookie_str)
-        # 确保 user_info 是字典类型
-        if isinstance(user_info, dict):
-            token = user_info.get('token')
-        if not token:
-            for item in cookie_str.split(';'):
-                item = item.strip()
-                if item.startswith('token='):
-                    token = item[6:]
-                    break
+    token = account.token if account else None
 
     # 如果有 token，尝试 API 方式
     if token:
@@ -392,8 +471,7 @@ def claim_rewards(page, cookie_str=None):
         if task_result and task_result.get('errno') == 0:
             tasks = extract_tasks_from_response(task_result)
 
-            claimed_count = 0
-            claimable_count = 0
+            claimable = []
 
             for task in tasks:
                 task_id = task.get('id') or task.get('taskId')
@@ -404,34 +482,46 @@ def claim_rewards(page, cookie_str=None):
                 # - status=2: 可领取（任务已完成，等待领取奖励）
                 # - status=3: 已完成（奖励已领取）
                 if status == 2:
-                    claimable_count += 1
                     print(f"  发现可领取任务: {task_name} (ID: {task_id}, status={status})")
-
-                    if task_id:
-                        success, result = claim_task_reward(token, task_id)
-                        if success:
-                            print(f"    [OK] 领取成功")
-                            claimed_count += 1
-                        else:
-                            print(f"    [FAIL] 领取失败")
+                    claimable.append((task_id, task_name))
                 elif status == 3:
                     print(f"  任务已领取: {task_name} (ID: {task_id}, status={status})")
                 elif status == 1:
                     print(f"  任务未完成: {task_name} (ID: {task_id}, status={status})")
 
-            if claimable_count == 0:
+            if not claimable:
                 print("没有可领取的奖励（没有已完成的任务）")
             else:
-                print(f"尝试领取 {claimable_count} 个任务，成功 {claimed_count} 个")
+                results = claim_tasks_bulk(token, [task_id for task_id, _ in claimable])
+                for task_id, task_name in claimable:
+                    if results.get(task_id):
+                        print(f"    [OK] 领取成功: {task_name}")
+                    else:
+                        print(f"    [FAIL] 领取失败: {task_name}")
+                claimed_count = sum(1 for ok in results.values() if ok)
+                print(f"尝试领取 {len(claimable)} 个任务，成功 {claimed_count} 个")
 
             return True  # API 调用成功就返回 True
 
     # 回退到 UI 方式
     print("回退到 UI 方式领取...")
+    if page is None:
+        if account is None:
+            return False
+        context, page = create_browser_context(account)
+        try:
+            return _claim_rewards_ui(page)
+        finally:
+            context.close()
+    return _claim_rewards_ui(page)
+
+
+def _claim_rewards_ui(page):
+    """在用户中心页面点击领取按钮"""
     try:
         # 访问用户中心
         print("访问用户中心...")
-        page.goto('https://i.zaimanhua.com/', wait_until='domcontentloaded')
+        page.goto(f'{I_BASE}/', wait_until='domcontentloaded')
         page.wait_for_timeout(5000)
 
         # 查找所有可领取的按钮（尝试多种选择器）
@@ -490,18 +580,18 @@ def claim_rewards(page, cookie_str=None):
         return False
 
 
-def create_browser_context(playwright, cookie_str):
-    """创建浏览器上下文"""
-    cookies = parse_cookies(cookie_str)
-    print(f"已解析 {len(cookies)} 个 Cookie")
+def create_browser_context(account):
+    """在共享浏览器中创建账号上下文，返回 (context, page)，用完后调用 context.close()
 
-    browser = playwright.chromium.launch(headless=True)
-    context = browser.new_context(
-        user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        viewport={'width': 1920, 'height': 1080}
-    )
-    context.add_cookies(cookies)
+    有已保存的登录状态时直接载入，context.restored_state 标记是否载入成功。
+    """
+    state = load_storage_state(account)
+    if state:
+        context = new_context(None, storage_state=state, viewport={'width': 1920, 'height': 1080})
+    else:
+        context = new_context(account.site_cookies, viewport={'width': 1920, 'height': 1080})
+    context.restored_state = bool(state)
     page = context.new_page()
     page.set_default_timeout(PAGE_TIMEOUT)
 
-    return browser, context, page
+    return context, page